@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+"""
+Compare the async dashboard and reports views served over WSGI and ASGI with
+a simulated remote database, and report latency percentiles as JSON.
+
+    python benchmarks/asgi_benchmark.py --latency-ms 5 --concurrency 1,8
+    python benchmarks/asgi_benchmark.py --transactions 5000 --output run.json
+
+Every query sleeps --latency-ms first and every new connection sleeps
+--connect-ms, standing in for the network round trip and the TCP/auth
+handshake to a database on another host. Modes:
+
+  wsgi-serial      config.wsgi's handler, one thread per client (as
+                   gunicorn's threaded workers), CONN_MAX_AGE 0 and
+                   DB_QUERY_FANOUT off: a connect per request, then the
+                   lookups one after another.
+  wsgi-persistent  The same with CONN_MAX_AGE set: connections are reused.
+  wsgi-fanout      Persistent connections and DB_QUERY_FANOUT on: lookups
+                   run at once on core.aio's pool threads.
+  asgi             config.asgi's handler, every client a task on one event
+                   loop (as a uvicorn worker), CONN_MAX_AGE 0 as Django
+                   requires there, so the lookups run one after another.
+
+Each run also reports database connections opened per request.
+
+Requests go straight into the WSGI/ASGI callables, as a server would call
+them, so no server needs installing.
+
+The dashboard cache is disabled (DummyCache) so every request queries.
+Without --database-url a temporary SQLite file is used, so never point it at
+real data.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import threading
+import time
+from collections import defaultdict
+
+from common import setup_django
+
+VIEWS = ['dashboard', 'reports']
+# mode: (handler, DB_QUERY_FANOUT, CONN_MAX_AGE)
+MODES = {
+    'wsgi-serial': ('wsgi', False, 0),
+    'wsgi-persistent': ('wsgi', False, 60),
+    'wsgi-fanout': ('wsgi', True, 60),
+    'asgi': ('asgi', False, 0),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="Simulated round trip per query.")
+    parser.add_argument('--connect-ms', type=float, default=20.0, help="Simulated handshake per new connection.")
+    parser.add_argument('--concurrency', default='1,8', help="Concurrent clients, comma separated.")
+    parser.add_argument('--requests', type=int, default=30, help="Requests per view per client.")
+    parser.add_argument('--transactions', type=int, default=2000, help="Seeded transactions per user.")
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--database-url', help="Scratch database; defaults to a temporary SQLite file.")
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout.")
+    return parser.parse_args()
+
+
+def _csv_ints(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def simulate_latency(query_seconds, connect_seconds):
+    """Install the delays; returns a list that grows by one per new connection."""
+    from django.db.backends.signals import connection_created
+
+    connects = []
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(query_seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connects.append(1)
+        time.sleep(connect_seconds)
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    return connects
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples, errors, wall):
+    views = {}
+    for view in VIEWS:
+        latencies = sorted(samples[view])
+        views[view] = {
+            'requests': len(latencies),
+            'errors': errors[view],
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+        }
+    total = sum(len(v) for v in samples.values())
+    return {'wall_s': round(wall, 2), 'throughput_rps': round(total / wall, 1), 'views': views}
+
+
+def session_cookie(user):
+    from django.conf import settings
+    from django.test import Client
+
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def wsgi_get(app, path, cookie):
+    # What a WSGI server does per request, minus the socket.
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': path, 'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie}
+    setup_testing_defaults(environ)
+    status = []
+    result = app(environ, lambda line, headers: status.append(int(line.split()[0])))
+    try:
+        b''.join(result)
+    finally:
+        result.close()  # fires request_finished, as servers must
+    return status[0]
+
+
+async def asgi_get(app, path, cookie):
+    # What an ASGI server does per request, minus the socket.
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Future()  # the client never disconnects
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def run_wsgi(cookies, clients, requests):
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import reverse
+
+    app = get_wsgi_application()
+    samples, errors = defaultdict(list), defaultdict(int)
+
+    def worker(cookie):
+        for _ in range(requests):
+            for view in VIEWS:
+                started = time.perf_counter()
+                status = wsgi_get(app, reverse(f'core:{view}'), cookie)
+                samples[view].append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors[view] += 1
+
+    pool = [threading.Thread(target=worker, args=(cookies[i % len(cookies)],)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return summarize(samples, errors, time.perf_counter() - started)
+
+
+def run_asgi(cookies, clients, requests):
+    from django.core.asgi import get_asgi_application
+    from django.urls import reverse
+
+    app = get_asgi_application()
+    samples, errors = defaultdict(list), defaultdict(int)
+
+    async def worker(cookie):
+        for _ in range(requests):
+            for view in VIEWS:
+                started = time.perf_counter()
+                status = await asgi_get(app, reverse(f'core:{view}'), cookie)
+                samples[view].append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors[view] += 1
+
+    async def main():
+        await asyncio.gather(*(worker(cookies[i % len(cookies)]) for i in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return summarize(samples, errors, time.perf_counter() - started)
+
+
+def main():
+    args = parse_args()
+    setup_django(args.database_url)
+
+    from django.conf import settings
+    from django.db import connection, connections
+    from django.test.utils import override_settings, setup_test_environment
+    from core import seeding
+
+    setup_test_environment()  # allows the 'testserver' host
+    override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}).enable()
+
+    concurrency = _csv_ints(args.concurrency)
+    users = seeding.seed(users=max(concurrency), transactions=args.transactions, months=args.months,
+                         prefix='asgi_', random_seed=args.seed)
+    connects = simulate_latency(args.latency_ms / 1000, args.connect_ms / 1000)
+
+    report = {
+        'meta': {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'latency_ms': args.latency_ms,
+            'connect_ms': args.connect_ms,
+            'transactions_per_user': args.transactions,
+            'requests_per_view_per_client': args.requests,
+        },
+        'runs': [],
+    }
+    cookies = [session_cookie(user) for user in users]
+    for mode in args.modes.split(','):
+        handler, fanout, max_age = MODES[mode]
+        for database in settings.DATABASES.values():
+            database['CONN_MAX_AGE'] = max_age
+        for clients in concurrency:
+            connections.close_all()
+            connects.clear()
+            with override_settings(DB_QUERY_FANOUT=fanout):
+                run = run_asgi if handler == 'asgi' else run_wsgi
+                result = run(cookies, clients, args.requests)
+            total = sum(view['requests'] for view in result['views'].values())
+            result['connects_per_request'] = round(len(connects) / total, 2)
+            report['runs'].append({'mode': mode, 'concurrency': clients, **result})
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""Shared setup for the scripts in this directory."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+
+def scratch_sqlite_url(name='bench.sqlite3'):
+    return 'sqlite:///' + os.path.join(tempfile.mkdtemp(), name)
+
+
+def setup_django(database_url=None):
+    """Point the project at a scratch database, then set up and migrate it."""
+    os.environ['DATABASE_URL'] = database_url or scratch_sqlite_url()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+Seed a scratch database with synthetic transactions and compare the dashboard
+queries with and without the Transaction indexes (core/migrations/0003).
+
+    python benchmarks/index_benchmark.py --rows 1000000
+    python benchmarks/index_benchmark.py --database-url postgres://user:pw@localhost/scratch
+
+Without --database-url a temporary SQLite file is used. The target database is
+migrated and filled with rows, so never point this at real data.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from common import setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query.")
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--database-url', help="Scratch database; defaults to a temporary SQLite file.")
+    return parser.parse_args()
+
+
+def seed(rows, users, batch_size):
+    from django.contrib.auth.models import User
+    from core.models import Category, Transaction
+
+    owners = User.objects.bulk_create(User(username=f'bench{i}') for i in range(users))
+    categories = Category.values
+    start = date.today() - timedelta(days=3 * 365)
+    rng = random.Random(42)
+
+    done = 0
+    while done < rows:
+        n = min(batch_size, rows - done)
+        Transaction.objects.bulk_create(
+            Transaction(
+                user=owners[rng.randrange(users)],
+                amount=Decimal(rng.randrange(100, 500_000)) / 100,
+                is_income=rng.random() < 0.15,
+                category=rng.choice(categories),
+                date=start + timedelta(days=rng.randrange(3 * 365)),
+            )
+            for _ in range(n)
+        )
+        done += n
+    return owners[0]
+
+
+def dashboard_queries(user):
+    from django.db.models import Sum
+    from core.models import Transaction
+    from core.summary import month_bounds
+
+    month_start, month_end = month_bounds(date.today())
+    txns = Transaction.objects.filter(user=user)
+    return {
+        'total income': lambda: txns.filter(is_income=True).aggregate(t=Sum('amount')),
+        'total expense': lambda: txns.filter(is_income=False).aggregate(t=Sum('amount')),
+        'month-to-date spend': lambda: txns.filter(
+            is_income=False, date__gte=month_start, date__lt=month_end
+        ).aggregate(t=Sum('amount')),
+        'daily flows (90d)': lambda: list(txns.filter(
+            date__gte=date.today() - timedelta(days=90)
+        ).values_list('date', 'is_income').annotate(t=Sum('amount')).order_by()),
+        'recent 5': lambda: list(txns.order_by('-date', '-created_at')[:5]),
+        'date range (90d)': lambda: list(txns.filter(
+            date__gte=date.today() - timedelta(days=90)
+        ).order_by('-date', '-created_at').values_list('id', flat=True)),
+    }
+
+
+def explain(sql):
+    from django.db import connection
+
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+
+
+def run(queries, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    results = {}
+    for name, query in queries.items():
+        with CaptureQueriesContext(connection) as captured:
+            query()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = (min(timings), [line for q in captured for line in explain(q['sql'])])
+    return results
+
+
+def set_indexes(enabled):
+    from django.db import connection
+    from core.models import Transaction
+
+    with connection.schema_editor() as editor:
+        for index in Transaction._meta.indexes:
+            if enabled:
+                editor.add_index(Transaction, index)
+            else:
+                editor.remove_index(Transaction, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def report(label, results):
+    print(f"\n=== {label} ===")
+    for name, (best_ms, plan) in results.items():
+        print(f"\n{name}: {best_ms:.2f} ms")
+        for line in plan:
+            print(f"    {line}")
+
+
+def main():
+    args = parse_args()
+    setup_django(args.database_url)
+
+    from django.db import connection
+
+    set_indexes(False)  # seed without indexes, then measure both ways
+    started = time.perf_counter()
+    user = seed(args.rows, args.users, args.batch_size)
+    print(f"Seeded {args.rows} rows for {args.users} users on {connection.vendor} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    queries = dashboard_queries(user)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    before = run(queries, args.repeat)
+    set_indexes(True)
+    after = run(queries, args.repeat)
+
+    report("Before indexes", before)
+    report("After indexes", after)
+
+    print("\n=== Summary (best of %d, ms) ===" % args.repeat)
+    for name in queries:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<22} {b:>10.2f} {a:>10.2f}   x{b / a if a else float('inf'):.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Report how many bytes each page costs a browser, as JSON: the HTML itself,
+the inline <style>/<script> inside it, and the static bundles it links.
+
+    python benchmarks/page_weight.py
+    python benchmarks/page_weight.py --baseline c8558b1 --output weight.json
+
+Pages are rendered as in production: DEBUG off, core/static collected into a
+temporary STATIC_ROOT by CompressedManifestStaticFilesStorage, and bundles
+fetched back through WhiteNoise to record the Cache-Control they're served
+with. Sizes are given raw and gzipped (the .gz files collectstatic writes;
+HTML at level 6, as a typical server would). A first visit costs the HTML
+plus every bundle; a repeat visit only the HTML, since hashed bundles are
+cached as immutable.
+
+--baseline renders the same pages from core/templates as of that git
+revision as well, for a before/after comparison. Without --database-url a
+temporary SQLite file is used, so never point it at real data.
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import re
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from common import REPO_ROOT, setup_django
+
+# (name, url name or None for templates no view renders yet, template, signed in)
+PAGES = [
+    ('home', None, 'core/home.html', False),
+    ('login', 'core:login', 'core/login.html', False),
+    ('register', 'core:register', 'core/register.html', False),
+    ('dashboard', 'core:dashboard', 'core/dashboard.html', True),
+    ('reports', 'core:reports', 'core/reports.html', True),
+    ('goals', 'core:goals', 'core/goals.html', True),
+    ('import', 'core:import_transactions', 'core/import_transactions.html', True),
+    ('profile', 'core:profile', 'core/profile.html', True),
+    ('save', None, 'core/save.html', True),
+]
+INLINE = {
+    'style': re.compile(rb'<style[^>]*>(.*?)</style>', re.S),
+    'script': re.compile(rb'<script(?![^>]*\bsrc=)[^>]*>(.*?)</script>', re.S),
+}
+LINKED = re.compile(rb'(?:href|src)="(/static/[^"]+)"')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', help="Git revision whose templates to measure as `before`.")
+    parser.add_argument('--transactions', type=int, default=500, help="Seeded transactions for the signed-in user.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help="Scratch database; defaults to a temporary SQLite file.")
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout.")
+    return parser.parse_args()
+
+
+def export_templates(revision):
+    directory = tempfile.mkdtemp()
+    archive = subprocess.run(['git', 'archive', revision, 'core/templates'], cwd=REPO_ROOT,
+                             check=True, capture_output=True).stdout
+    subprocess.run(['tar', '-x', '-C', directory], input=archive, check=True)
+    return Path(directory) / 'core' / 'templates'
+
+
+def gzipped(data):
+    return len(gzip.compress(data, compresslevel=6))
+
+
+def asset(client, url):
+    from django.conf import settings
+
+    path = Path(settings.STATIC_ROOT) / url[len(settings.STATIC_URL):]
+    compressed = path.with_name(path.name + '.gz')
+    response = client.get(url)
+    return {
+        'url': url,
+        'status': response.status_code,
+        'bytes': path.stat().st_size,
+        'gzip_bytes': compressed.stat().st_size if compressed.exists() else gzipped(path.read_bytes()),
+        'cache_control': response.get('Cache-Control'),
+    }
+
+
+def measure(html, client):
+    assets = [asset(client, url.decode()) for url in dict.fromkeys(LINKED.findall(html))]
+    page = {
+        'html_bytes': len(html),
+        'html_gzip_bytes': gzipped(html),
+        'inline_style_bytes': sum(len(body) for body in INLINE['style'].findall(html)),
+        'inline_script_bytes': sum(len(body) for body in INLINE['script'].findall(html)),
+        'assets': assets,
+    }
+    page['first_visit_gzip_bytes'] = page['html_gzip_bytes'] + sum(a['gzip_bytes'] for a in assets)
+    page['repeat_visit_gzip_bytes'] = page['html_gzip_bytes'] + sum(
+        a['gzip_bytes'] for a in assets if 'immutable' not in (a['cache_control'] or ''))
+    return page
+
+
+def render_pages(user):
+    from django.contrib.auth.models import AnonymousUser
+    from django.template.loader import render_to_string
+    from django.test import Client, RequestFactory
+    from django.urls import reverse
+
+    signed_in, anonymous = Client(), Client()
+    signed_in.force_login(user)
+    pages = {}
+    for name, url_name, template, private in PAGES:
+        client = signed_in if private else anonymous
+        if url_name:
+            response = client.get(reverse(url_name))
+            assert response.status_code == 200, (name, response.status_code)
+            html = response.content
+        else:
+            request = RequestFactory().get('/')
+            request.user = user if private else AnonymousUser()
+            html = render_to_string(template, request=request).encode()
+        pages[name] = measure(html, anonymous)
+    return pages
+
+
+def main():
+    args = parse_args()
+    os.environ['DEBUG'] = 'False'  # {% static %} resolves to hashed names only with DEBUG off
+    setup_django(args.database_url)
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test.utils import override_settings, setup_test_environment
+    from core import seeding
+
+    setup_test_environment()  # allows the 'testserver' host
+    override_settings(STATIC_ROOT=tempfile.mkdtemp()).enable()
+    call_command('collectstatic', interactive=False, verbosity=0)
+    user, = seeding.seed(users=1, transactions=args.transactions, prefix='weight_', random_seed=args.seed)
+
+    variants = {'after': None}
+    if args.baseline:
+        variants = {'before': export_templates(args.baseline), **variants}
+    results = {}
+    for variant, directory in variants.items():
+        templates = [dict(settings.TEMPLATES[0], DIRS=[directory])] if directory else settings.TEMPLATES
+        with override_settings(TEMPLATES=templates):
+            results[variant] = render_pages(user)
+
+    report = {
+        'meta': {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'baseline': args.baseline,
+            'storage': settings.STATICFILES_STORAGE,
+        },
+        'pages': {name: {variant: pages[name] for variant, pages in results.items()} for name, *_ in PAGES},
+    }
+    if args.baseline:
+        for name, page in report['pages'].items():
+            before, after = page['before'], page['after']
+            page['html_gzip_saved_pct'] = round(100 * (1 - after['html_gzip_bytes'] / before['html_gzip_bytes']), 1)
+            page['repeat_visit_saved_pct'] = round(
+                100 * (1 - after['repeat_visit_gzip_bytes'] / before['repeat_visit_gzip_bytes']), 1)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
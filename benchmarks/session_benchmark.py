@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Count the queries behind each signed-in request, and time it, for every
+SESSION_MODE with the per-process user cache off and on, and report them
+as JSON.
+
+    python benchmarks/session_benchmark.py
+    python benchmarks/session_benchmark.py --requests 500 --output run.json
+
+Every query on every connection is counted. The session (django_session)
+and user (auth_user) lookups are also counted separately, since those are
+what the session mode and USER_CACHE_TTL remove. Each run logs in a fresh
+client, sends one warm-up request that fills the caches, then measures
+--requests requests per view. Without --database-url a temporary SQLite
+file is used, so never point it at real data.
+"""
+import argparse
+import json
+import platform
+import threading
+import time
+from collections import Counter
+
+from common import setup_django
+
+VIEWS = ['profile', 'goals', 'dashboard']
+MODES = ['db', 'cached_db', 'signed_cookies']
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help="Measured requests per view per run.")
+    parser.add_argument('--user-cache-ttl', type=int, default=30, help="USER_CACHE_TTL for the cached runs.")
+    parser.add_argument('--transactions', type=int, default=500, help="Seeded transactions for the user.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help="Scratch database; defaults to a temporary SQLite file.")
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout.")
+    return parser.parse_args()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        kind = 'session' if 'django_session' in sql else 'user' if '"auth_user"' in sql else 'other'
+        with self.lock:
+            self.counts[kind] += 1
+        return execute(sql, params, many, context)
+
+    def take(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+        return counts
+
+
+def count_queries():
+    # Every connection, including the ones core.aio opens on pool threads.
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    counter = QueryCounter()
+
+    def install(sender, connection, **kwargs):
+        if counter not in connection.execute_wrappers:
+            connection.execute_wrappers.append(counter)
+
+    connection_created.connect(install, weak=False)
+    connections.close_all()
+    return counter
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(user, requests, counter):
+    from django.test import Client
+    from django.urls import reverse
+
+    client = Client()
+    client.force_login(user)
+    views = {}
+    for view in VIEWS:
+        url = reverse(f'core:{view}')
+        assert client.get(url).status_code == 200, view  # warm-up
+        counter.take()
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            client.get(url)
+            samples.append((time.perf_counter() - started) * 1000)
+        counts = counter.take()
+        samples.sort()
+        views[view] = {
+            'queries_per_request': round(sum(counts.values()) / requests, 2),
+            'session_queries_per_request': round(counts['session'] / requests, 2),
+            'user_queries_per_request': round(counts['user'] / requests, 2),
+            'p50_ms': round(percentile(samples, 0.50), 2),
+            'p95_ms': round(percentile(samples, 0.95), 2),
+        }
+    return views
+
+
+def main():
+    args = parse_args()
+    setup_django(args.database_url)
+
+    from django.test.utils import override_settings, setup_test_environment
+    from core import seeding
+
+    setup_test_environment()  # allows the 'testserver' host
+    user, = seeding.seed(users=1, transactions=args.transactions, prefix='session_', random_seed=args.seed)
+    counter = count_queries()
+
+    report = {
+        'meta': {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'requests_per_view': args.requests,
+            'transactions': args.transactions,
+        },
+        'runs': [],
+    }
+    for mode in MODES:
+        for ttl in (0, args.user_cache_ttl):
+            with override_settings(SESSION_MODE=mode, SESSION_ENGINE=ENGINES[mode], USER_CACHE_TTL=ttl):
+                views = run(user, args.requests, counter)
+            report['runs'].append({'session_mode': mode, 'user_cache_ttl': ttl, 'views': views})
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
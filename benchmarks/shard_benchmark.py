@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Measure concurrent write throughput as the money tables are spread over more
+SQLite files, and report it as JSON.
+
+    python benchmarks/shard_benchmark.py --shards 1,2,4,8 --writers 8
+    python benchmarks/shard_benchmark.py --requests 500 --output run.json
+
+For each shard count a fresh directory gets a `default` database plus that
+many shard files (SHARD_DATABASE_URLS, as in production), all migrated. Then
+--writers threads, one user each, POST transactions to /api/transactions/ as
+fast as they can. Each shard count runs in its own process, since the
+database settings are read once at startup. With one shard every writer
+queues on a single file's write lock; with more, users on different shards
+commit in parallel.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+from common import setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', default='1,2,4,8', help="Shard counts, comma separated.")
+    parser.add_argument('--writers', type=int, default=8, help="Concurrent writer threads, one user each.")
+    parser.add_argument('--requests', type=int, default=200, help="POSTs per writer.")
+    parser.add_argument('--timeout', type=int, default=60, help="SQLite busy timeout in seconds.")
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout.")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def _csv_ints(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def _url(directory, name, timeout):
+    return f'sqlite:///{os.path.join(directory, name)}?timeout={timeout}'
+
+
+def setup(shards, timeout):
+    directory = tempfile.mkdtemp()
+    os.environ['SHARD_DATABASE_URLS'] = ','.join(_url(directory, f'shard{n}.sqlite3', timeout) for n in range(shards))
+    setup_django(_url(directory, 'default.sqlite3', timeout))
+
+    from django.conf import settings
+    from django.core.management import call_command
+    for alias in settings.MONEY_SHARDS:
+        call_command('migrate', database=alias, verbosity=0)
+
+
+def worker(user, requests, samples, retries):
+    from django.db import connections
+    from django.test import Client
+
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+    today = date.today().isoformat()
+    try:
+        for n in range(requests):
+            started = time.perf_counter()
+            # A deferred SQLite transaction can still lose the write lock race
+            # ("database is locked") without waiting; count and retry those.
+            while client.post('/api/transactions/', {
+                'date': today, 'amount': f'{100 + n % 50}.00', 'is_income': False,
+                'category': 'food', 'note': 'benchmark',
+            }, content_type='application/json').status_code >= 500:
+                retries.append(n)
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        connections.close_all()
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def child(args):
+    setup(args.child, args.timeout)
+
+    from django.contrib.auth.models import User
+    from django.test.utils import setup_test_environment
+    from core import sharding
+
+    setup_test_environment()  # lets the test client run against ALLOWED_HOSTS etc.
+    logging.disable(logging.ERROR)  # retried lock errors would each log a traceback
+    users = [User.objects.create_user(f'writer{n}', password='x') for n in range(args.writers)]
+    samples, retries = [], []
+    pool = [threading.Thread(target=worker, args=(user, args.requests, samples, retries)) for user in users]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    wall = time.perf_counter() - started
+    latencies = sorted(samples)
+    return {
+        'shards': args.child,
+        'writers_per_shard': sorted(len(ids) for ids in sharding.by_shard(u.pk for u in users).values()),
+        'writes': len(latencies),
+        'lock_retries': len(retries),
+        'wall_s': round(wall, 2),
+        'writes_per_s': round(len(latencies) / wall, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+    }
+
+
+def main():
+    args = parse_args()
+    if args.child is not None:
+        print(json.dumps(child(args)))
+        return
+
+    report = {
+        'meta': {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'writers': args.writers,
+            'requests_per_writer': args.requests,
+        },
+        'runs': [],
+    }
+    for shards in _csv_ints(args.shards):
+        command = [sys.executable, __file__, '--child', str(shards), '--writers', str(args.writers),
+                   '--requests', str(args.requests), '--timeout', str(args.timeout)]
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        report['runs'].append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    baseline = report['runs'][0]['writes_per_s']
+    for run in report['runs']:
+        run['speedup'] = round(run['writes_per_s'] / baseline, 2)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+Drive the main views through Django's test client against seeded data and
+report latency percentiles and queries per request as JSON.
+
+    python benchmarks/view_benchmark.py --sizes 100,1000,10000 --concurrency 1,4,8
+    python benchmarks/view_benchmark.py --output run.json --cold
+
+Each size seeds fresh users (via core.seeding, as `manage.py seed_money_data`
+does) with that many transactions apiece; each concurrency level runs that
+many client threads, one user per thread. Queries are counted on every
+connection, including those of core.aio's pool threads. Without
+--database-url a temporary SQLite file is used, so never point it at real
+data.
+"""
+import argparse
+import json
+import platform
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import date
+
+from common import setup_django
+
+VIEWS = ['dashboard', 'reports', 'add_transaction', 'save_budget']
+# Queries run for the request being measured, on any thread.
+counter = ContextVar('benchmark_queries', default=None)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,1000,10000', help="Transactions per user, comma separated.")
+    parser.add_argument('--concurrency', default='1,4', help="Client threads, comma separated.")
+    parser.add_argument('--requests', type=int, default=50, help="Requests per view per thread.")
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cold', action='store_true', help="Turn the dashboard cache off (DATA_CACHE_ENABLED).")
+    parser.add_argument('--database-url', help="Scratch database; defaults to a temporary SQLite file.")
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout.")
+    return parser.parse_args()
+
+
+def _csv_ints(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def request_for(view, client, n):
+    from django.urls import reverse
+
+    if view == 'add_transaction':
+        return client.post(reverse('core:add_transaction'), {
+            'type': 'expense', 'date': date.today().isoformat(), 'category': 'food',
+            'amount': f'{100 + n % 50}.00', 'note': 'benchmark',
+        })
+    if view == 'save_budget':
+        return client.post(reverse('core:save_budget'), {'budget_amount': str(20000 + n)})
+    return client.get(reverse(f'core:{view}'))
+
+
+def count_queries(execute, sql, params, many, context):
+    # On every connection; the request's counter follows its lookups onto
+    # core.aio's pool threads, since sync_to_async copies the context.
+    counted = counter.get()
+    if counted is not None:
+        counted.append(sql)
+    return execute(sql, params, many, context)
+
+
+def install_counter():
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def install(sender, connection, **kwargs):
+        if count_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.append(count_queries)
+
+    connection_created.connect(install, weak=False)
+    for alias in connections:
+        install(None, connections[alias])
+
+
+def worker(user, requests, samples, errors):
+    from django.db import connection
+    from django.test import Client
+
+    client = Client()
+    client.force_login(user)
+    try:
+        for n in range(requests):
+            for view in VIEWS:
+                captured = []
+                token = counter.set(captured)
+                try:
+                    started = time.perf_counter()
+                    response = request_for(view, client, n)
+                    elapsed = (time.perf_counter() - started) * 1000
+                finally:
+                    counter.reset(token)
+                if response.status_code >= 400:
+                    errors[view] += 1
+                samples[view].append((elapsed, len(captured)))
+    finally:
+        connection.close()
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples, errors):
+    results = {}
+    for view in VIEWS:
+        latencies = sorted(s[0] for s in samples[view])
+        queries = [s[1] for s in samples[view]]
+        results[view] = {
+            'requests': len(latencies),
+            'errors': errors[view],
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'mean_queries': round(sum(queries) / len(queries), 2),
+            'max_queries': max(queries),
+        }
+    return results
+
+
+def run(users, threads, requests):
+    samples, errors = defaultdict(list), defaultdict(int)
+    pool = [
+        threading.Thread(target=worker, args=(users[i % len(users)], requests, samples, errors))
+        for i in range(threads)
+    ]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    wall = time.perf_counter() - started
+    total = sum(len(v) for v in samples.values())
+    return {'wall_s': round(wall, 2), 'throughput_rps': round(total / wall, 1), 'views': summarize(samples, errors)}
+
+
+def main():
+    args = parse_args()
+    setup_django(args.database_url)
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+    from core import seeding
+
+    setup_test_environment()  # lets the test client run against ALLOWED_HOSTS etc.
+    # One process, so its local-memory cache is shared by every client thread.
+    override_settings(DATA_CACHE_ENABLED=not args.cold).enable()
+
+    install_counter()
+    concurrency = _csv_ints(args.concurrency)
+    report = {
+        'meta': {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'] if settings.DATA_CACHE_ENABLED else None,
+            'requests_per_view_per_thread': args.requests,
+            'months': args.months,
+        },
+        'runs': [],
+    }
+    for size in _csv_ints(args.sizes):
+        users = seeding.seed(users=max(concurrency), transactions=size, months=args.months,
+                             prefix=f'bench{size}_', random_seed=args.seed)
+        for threads in concurrency:
+            result = run(users, threads, args.requests)
+            report['runs'].append({'transactions_per_user': size, 'concurrency': threads, **result})
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -22,16 +22,22 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.authcache.CachedAuthenticationMiddleware',
+    'core.sharding.ShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-view query/SQL/template/wall timings with Server-Timing headers; off by default.
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', 'False') == 'True'
+REQUEST_METRICS_WINDOW = int(os.environ.get('REQUEST_METRICS_WINDOW', 1000))
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -51,6 +57,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 DATABASES = {
     'default': {
@@ -63,6 +70,91 @@ database_url = os.environ.get("DATABASE_URL")
 if database_url:
     DATABASES["default"] = dj_database_url.parse(database_url)
 
+# Optional per-user sharding of the money tables (see core.sharding): a
+# comma-separated list of database URLs, one shard each. Users and sessions
+# stay on `default`. After changing the list, run `manage.py migrate
+# --database <alias>` for new shards and `manage.py rebalance_shards`.
+MONEY_SHARDS = []
+for index, url in enumerate(filter(None, os.environ.get("SHARD_DATABASE_URLS", "").split(","))):
+    DATABASES[f"shard{index}"] = dj_database_url.parse(url.strip())
+    MONEY_SHARDS.append(f"shard{index}")
+if MONEY_SHARDS:
+    DATABASE_ROUTERS = ["core.sharding.UserShardRouter"]
+
+# Seconds to keep database connections open between requests; 0 reconnects
+# every request. Leave it at 0 under ASGI, where each request runs on a new
+# thread and a kept connection is never reused.
+conn_max_age = int(os.environ.get('DB_CONN_MAX_AGE', 0))
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = conn_max_age
+
+# Async views (dashboard, reports) can run their independent queries at once
+# on DB_QUERY_FANOUT_THREADS long-lived threads per process, each holding its
+# own connection (see core.aio). Only used with DB_CONN_MAX_AGE set, since a
+# fresh connect per lookup costs more than the overlap saves.
+DB_QUERY_FANOUT = os.environ.get('DB_QUERY_FANOUT', 'False') == 'True'
+DB_QUERY_FANOUT_THREADS = int(os.environ.get('DB_QUERY_FANOUT_THREADS', 4))
+
+# Local-memory cache by default. To share one cache between worker
+# processes set REDIS_URL (needs the redis package), MEMCACHED_LOCATION
+# (needs pymemcache) or CACHE_DIR, a file-based cache that needs no server.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'money-analyzer',
+    }
+}
+
+redis_url = os.environ.get('REDIS_URL')
+memcached_location = os.environ.get('MEMCACHED_LOCATION')
+cache_dir = os.environ.get('CACHE_DIR')
+if redis_url:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': redis_url,
+    }
+elif memcached_location:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': memcached_location,
+    }
+elif cache_dir:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': cache_dir,
+    }
+
+# The dashboard cache and the data-derived ETag/Last-Modified of conditional
+# pages (core.caching) hang off a per-user data version kept in the default
+# cache. With a per-process cache, a worker that didn't see a write would
+# keep serving the old dashboard and answering 304, so they are on only
+# when the cache is shared. A single-process deployment can opt in with
+# DATA_CACHE_ENABLED=True.
+DATA_CACHE_ENABLED = os.environ.get(
+    'DATA_CACHE_ENABLED', str(bool(redis_url or memcached_location or cache_dir))
+) == 'True'
+
+# Seconds a cached dashboard lives; writes invalidate it sooner via core.caching.
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 300))
+
+# Where sessions live: 'db' queries django_session on every request; 'cached_db'
+# reads through the default cache and writes to both; 'signed_cookies' keeps the
+# session in the cookie itself, so logging out can't revoke a copied cookie.
+# cached_db needs a cache every worker shares (see CACHES): with the per-process
+# local-memory cache, a logout only reaches the worker that handled it.
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+
+# Seconds each worker reuses a signed-in user instead of querying auth_user
+# (core.authcache). Off by default: a worker that didn't handle a password
+# change or deactivation keeps accepting the old session until its copy
+# expires, so only opt in with a TTL that window can tolerate.
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 0))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -85,11 +177,22 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic writes content-hashed, gzipped copies of core/static; WhiteNoise serves
+# hashed names with a ten-year `immutable` Cache-Control, so pages only re-send HTML.
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-STATICFILES_DIRS = [BASE_DIR / 'core' / 'static']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# clear_data hands deletion to core.purge, which commits it in chunks of this size.
+# Turn the in-process worker thread off to leave purges to `manage.py purge_transactions`.
+TRANSACTION_PURGE_CHUNK_SIZE = int(os.environ.get('TRANSACTION_PURGE_CHUNK_SIZE', 1000))
+TRANSACTION_PURGE_IN_THREAD = os.environ.get('TRANSACTION_PURGE_IN_THREAD', 'True') == 'True'
+
+REST_FRAMEWORK = {
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+}
+
 LOGIN_URL = 'core:login'
 LOGIN_REDIRECT_URL = 'core:dashboard'
 LOGOUT_REDIRECT_URL = 'core:login'
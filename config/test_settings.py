@@ -0,0 +1,18 @@
+"""
+Settings for `manage.py test`: the project's settings plus two SQLite shard
+databases for the sharding tests in core/tests.py. The shards are only used
+by tests that turn MONEY_SHARDS and the router on with override_settings;
+every other test runs unsharded on `default`.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+for alias in ('shard0', 'shard1'):
+    DATABASES.setdefault(alias, {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{alias}.sqlite3',
+        'CONN_MAX_AGE': 0,
+    })
+
+# Pages render without running collectstatic first.
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Transaction, SavingsGoal, Budget
+from .models import Category, Transaction, SavingsGoal, Budget, MonthlySummary, PurgeJob, RecurringTransaction, DailyBalance, ArchivedTransaction
 
 # admin.site.register(Category) # Category is an Enum in models.py, cannot register directly unless it's a Model. 
 # Wait, in app.py logic line 180 CategoryForm uses model=Category. 
@@ -21,3 +21,8 @@ from .models import Category, Transaction, SavingsGoal, Budget
 admin.site.register(Transaction)
 admin.site.register(SavingsGoal)
 admin.site.register(Budget)
+admin.site.register(MonthlySummary)
+admin.site.register(PurgeJob)
+admin.site.register(RecurringTransaction)
+admin.site.register(DailyBalance)
+admin.site.register(ArchivedTransaction)
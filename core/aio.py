@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections, connections
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    # One pool per process whose threads outlive requests, so each keeps its
+    # database connections between them (CONN_MAX_AGE).
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=getattr(settings, 'DB_QUERY_FANOUT_THREADS', 4),
+                                       thread_name_prefix='db-fanout')
+    return _pool
+
+
+def _persistent():
+    return all(connections.settings[alias].get('CONN_MAX_AGE', 0) != 0 for alias in connections)
+
+
+def _isolated(call):
+    # Pool threads never see request_started/request_finished, so retire
+    # their connections the same way (CONN_MAX_AGE, errors, health checks) here.
+    def run():
+        close_old_connections()
+        try:
+            return call()
+        finally:
+            close_old_connections()
+    return run
+
+
+def fanout_enabled():
+    return getattr(settings, 'DB_QUERY_FANOUT', False) and _persistent()
+
+
+async def gather(*calls):
+    """
+    Run independent blocking lookups (zero-argument callables doing ORM
+    work); returns their results in order.
+
+    Django 5.0's async ORM (aaggregate(), afirst(), async for) runs every
+    query on the request's one sync thread, so gathering those overlaps
+    nothing. With DB_QUERY_FANOUT on and persistent connections
+    (CONN_MAX_AGE) each call goes to a long-lived pool thread that reuses
+    its own connection, with the caller's context (the shard routing in
+    core.sharding, request metrics) copied in: the request waits for the
+    slowest lookup rather than for all of them in turn. Without persistent
+    connections every call would pay a fresh connect, which costs more
+    than it overlaps, so they run one after another on the request's
+    connection instead.
+    """
+    if not fanout_enabled():
+        return await sync_to_async(lambda: [call() for call in calls])()
+    executor = _executor()
+    return await asyncio.gather(*(
+        sync_to_async(_isolated(call), thread_sensitive=False, executor=executor)() for call in calls
+    ))
+
+
+def login_required(view):
+    """
+    contrib.auth's login_required for async views, which Django 5.0's can't
+    wrap. The user is resolved here once, so sync code later in the request
+    (ETag functions, templates) never loads the session from the event loop.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
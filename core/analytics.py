@@ -0,0 +1,159 @@
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from functools import partial
+from typing import NamedTuple
+
+import numpy as np
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from . import aio, archive
+from .models import Category, MonthlySummary, Transaction
+from .money import ZERO, Money
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+ROLLING_WINDOW = 30
+
+
+class DailySpend(NamedTuple):
+    # One entry per day with spending. Days are proleptic ordinals
+    # (date.toordinal()), amounts integer paise, counts transactions.
+    day: np.ndarray
+    paise: np.ndarray
+    count: np.ndarray
+
+
+def monthly_rows(user):
+    """(month, category, is_income, total, count) rows of the user's MonthlySummary, archived months included."""
+    return list(
+        MonthlySummary.objects.filter(user=user, count__gt=0)
+        .order_by('month')
+        .values_list('month', 'category', 'is_income', 'total', 'count')
+    )
+
+
+def _hot_spend(user):
+    # One GROUP BY that walks the (user, date, is_income, amount) index.
+    return [
+        (day, total.paise, n)
+        for day, total, n in Transaction.objects.filter(user=user, is_income=False)
+        .values_list('date')
+        .annotate(total=Sum('amount'), n=Count('*'))
+        .order_by()
+    ]
+
+
+def _archived_spend(user):
+    totals = archive.day_totals(archive.blocks(user))
+    return [(day, paise, n) for (day, is_income), (paise, n) in totals.items() if not is_income]
+
+
+def daily_spend(rows):
+    """Fold (date, paise, count) rows into a DailySpend."""
+    totals = defaultdict(lambda: [0, 0])
+    for day, paise, n in rows:
+        entry = totals[day.toordinal()]
+        entry[0] += paise
+        entry[1] += n
+    size = len(totals)
+    return DailySpend(
+        day=np.fromiter(totals.keys(), dtype=np.int64, count=size),
+        paise=np.fromiter((paise for paise, _ in totals.values()), dtype=np.int64, count=size),
+        count=np.fromiter((n for _, n in totals.values()), dtype=np.int64, count=size),
+    )
+
+
+def _sum_by(keys, weights, size):
+    # bincount sums in float64, which is exact for totals below 2**53 paise.
+    return np.rint(np.bincount(keys, weights=weights, minlength=size)).astype(np.int64)
+
+
+def rupees(paise):
+    return Money(int(paise))
+
+
+def by_category(monthly):
+    totals, counts = Counter(), Counter()
+    for _, category, is_income, total, count in monthly:
+        if not is_income:
+            totals[category] += total.paise
+            counts[category] += count
+    return [
+        {'category': label, 'total': rupees(totals[value]), 'count': counts[value]}
+        for value, label in Category.choices
+        if counts[value]
+    ]
+
+
+def by_month(monthly):
+    income, expense = defaultdict(int), defaultdict(int)
+    for month, _, is_income, total, _ in monthly:
+        (income if is_income else expense)[month] += total.paise
+    return [
+        {
+            'month': month,
+            'income': rupees(income[month]),
+            'expense': rupees(expense[month]),
+            'net': rupees(income[month] - expense[month]),
+        }
+        for month in sorted(income.keys() | expense.keys())
+    ]
+
+
+def by_weekday(spend):
+    weekday = (spend.day + 6) % 7  # date.weekday(): Monday is 0
+    totals = _sum_by(weekday, spend.paise, 7)
+    counts = _sum_by(weekday, spend.count, 7)
+    return [
+        {'weekday': name, 'total': rupees(totals[i]), 'count': int(counts[i])}
+        for i, name in enumerate(WEEKDAYS)
+    ]
+
+
+def rolling_spend(spend, window=ROLLING_WINDOW, days=90, today=None):
+    """Trailing `window`-day spend for each of the last `days` days up to `today`."""
+    today = today or timezone.localdate()
+    end = today.toordinal()
+    start = end - days - window + 2
+    recent = (spend.day >= start) & (spend.day <= end)
+    daily = _sum_by(spend.day[recent] - start, spend.paise[recent], end - start + 1)
+    cumulative = np.concatenate(([0], np.cumsum(daily)))
+    trailing = cumulative[window:] - cumulative[:-window]
+    first = date.fromordinal(start + window - 1)
+    return [
+        {'date': first + timedelta(days=i), 'total': rupees(total)}
+        for i, total in enumerate(trailing)
+    ]
+
+
+def build_report(user, today=None):
+    """
+    The reports page's figures in three queries. Category and month totals
+    come from MonthlySummary (one row per month, category and kind), while
+    weekday totals and the rolling spend come from per-day spend: one
+    GROUP BY over the (user, date, is_income, amount) index plus the
+    archived blocks. No query returns a row per transaction.
+    """
+    return report(monthly_rows(user), daily_spend(_hot_spend(user) + _archived_spend(user)), today)
+
+
+async def abuild_report(user, today=None):
+    """build_report() with its three queries run through core.aio.gather."""
+    monthly, hot, archived = await aio.gather(
+        partial(monthly_rows, user), partial(_hot_spend, user), partial(_archived_spend, user),
+    )
+    return report(monthly, daily_spend(hot + archived), today)
+
+
+def report(monthly, spend, today=None):
+    rolling = rolling_spend(spend, today=today)
+    return {
+        'transaction_count': sum(row[4] for row in monthly),
+        'by_category': by_category(monthly),
+        'by_month': by_month(monthly),
+        'by_weekday': by_weekday(spend),
+        'rolling_spend': rolling,
+        'rolling_window': ROLLING_WINDOW,
+        'rolling_current': rolling[-1]['total'] if rolling else ZERO,
+    }
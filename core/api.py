@@ -0,0 +1,200 @@
+from django.db import IntegrityError
+from django.utils import timezone
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from . import archive, budgets, ledger, projections, rollups, search, sharding
+from .models import Budget, SavingsGoal, Transaction
+from .pagination import BudgetPagination, KeysetPagination, TransactionPagination
+from .serializers import (
+    BalancePointSerializer,
+    BalanceQuerySerializer,
+    BudgetSerializer,
+    GoalProjectionsSerializer,
+    SavingsGoalSerializer,
+    TransactionFilterSerializer,
+    TransactionSearchResultSerializer,
+    TransactionSearchSerializer,
+    TransactionSerializer,
+)
+
+
+class UserOwnedViewSet(viewsets.ModelViewSet):
+    """CRUD over the requesting user's rows only, keyset-paginated."""
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    model = None
+
+    def get_queryset(self):
+        queryset = self.model.objects.filter(user=self.request.user)
+        return self.select_fields(queryset)
+
+    def select_fields(self, queryset):
+        # With ?fields=..., only load the requested columns plus those the
+        # keyset cursor needs.
+        wanted = self.request.query_params.get('fields')
+        if not wanted:
+            return queryset
+        serializer_fields = set(self.get_serializer_class().Meta.fields)
+        columns = {name.strip() for name in wanted.split(',')} & serializer_fields
+        ordering = {name.lstrip('-') for name in self.pagination_class.ordering}
+        return queryset.only('user_id', *(columns | ordering))
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class TransactionViewSet(UserOwnedViewSet):
+    model = Transaction
+    serializer_class = TransactionSerializer
+    pagination_class = TransactionPagination
+    MAX_BULK = 5000
+    BULK_BATCH_SIZE = 1000
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        params = self.list_filters()
+        if params.get('start'):
+            queryset = queryset.filter(date__gte=params['start'])
+        if params.get('end'):
+            queryset = queryset.filter(date__lte=params['end'])
+        if params.get('category'):
+            queryset = queryset.filter(category=params['category'])
+        if params.get('is_income') is not None:
+            queryset = queryset.filter(is_income=params['is_income'])
+        return queryset
+
+    def list_filters(self):
+        filters = TransactionFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return filters.validated_data
+
+    def archived_page(self, limit, cursor, floor=None):
+        # Archived rows are listed (merged in by TransactionPagination) but
+        # read-only: retrieve, update and delete only see the hot table.
+        filters = dict(self.list_filters())
+        if floor:
+            filters['start'] = max(filters.get('start') or floor, floor)
+        return archive.page(self.request.user, limit, cursor, **filters)
+
+    # Writes keep the monthly rollup in step, as add_transaction does.
+
+    def perform_create(self, serializer):
+        with sharding.atomic():
+            txn = serializer.save(user=self.request.user)
+            rollups.apply_transaction(txn)
+
+    def perform_update(self, serializer):
+        with sharding.atomic():
+            before = Transaction.objects.select_for_update().get(pk=serializer.instance.pk)
+            txn = serializer.save()
+            rollups.apply_transaction(before, sign=-1)
+            rollups.apply_transaction(txn)
+
+    def perform_destroy(self, instance):
+        with sharding.atomic():
+            instance.delete()
+            rollups.apply_transaction(instance, sign=-1)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create up to MAX_BULK transactions from a JSON array in one request.
+        Items are validated individually with one shared serializer; the valid
+        ones are written with a single bulk_create (plus their rollup update)
+        and invalid ones are reported by index. Returns 201 if anything was
+        created, 400 otherwise.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'detail': 'Expected a JSON array of transactions.'})
+        if len(items) > self.MAX_BULK:
+            raise ValidationError({'detail': f'At most {self.MAX_BULK} transactions per request.'})
+
+        validator = self.get_serializer()
+        rows, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                data = validator.run_validation(item)
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+                continue
+            rows.append(Transaction(user=request.user, **data))
+
+        if rows:
+            with sharding.atomic():
+                Transaction.objects.bulk_create(rows, batch_size=self.BULK_BATCH_SIZE)
+                rollups.apply_transactions(rows)
+        return Response(
+            {'created': len(rows), 'ids': [row.pk for row in rows], 'errors': errors},
+            status=status.HTTP_201_CREATED if rows else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+    @action(detail=False)
+    def balance(self, request):
+        """
+        Running balance from the daily ledger: at the end of ?date= (default
+        today), or for each day with transactions from ?start= to ?end=
+        (default today), starting with the opening balance on start.
+        """
+        params = BalanceQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        today = timezone.localdate()
+        if 'start' in data:
+            points = ledger.series(request.user, data['start'], data.get('end', today))
+            return Response({'results': BalancePointSerializer(
+                [{'date': day, 'balance': balance} for day, balance in points], many=True
+            ).data})
+        day = data.get('date', today)
+        return Response(BalancePointSerializer({'date': day, 'balance': ledger.balance_at(request.user, day)}).data)
+
+    @action(detail=False)
+    def search(self, request):
+        """
+        Ranked prefix search over notes: ?q=elec bill, optionally narrowed by
+        start/end dates, min_amount/max_amount, category and is_income.
+        """
+        params = TransactionSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        results = search.search(request.user, data.pop('q'), **data)
+        return Response({'results': TransactionSearchResultSerializer(results, many=True).data})
+
+
+class SavingsGoalViewSet(UserOwnedViewSet):
+    model = SavingsGoal
+    serializer_class = SavingsGoalSerializer
+
+    @action(detail=False)
+    def projections(self, request):
+        """Completion date and required monthly contribution for every goal."""
+        data = projections.build_projections(request.user)
+        return Response(GoalProjectionsSerializer(data).data)
+
+
+class BudgetViewSet(UserOwnedViewSet):
+    model = Budget
+    serializer_class = BudgetSerializer
+    pagination_class = BudgetPagination
+
+    def perform_create(self, serializer):
+        # POST is an upsert on (user, month, category), like the dashboard form.
+        data = serializer.validated_data
+        serializer.instance = budgets.set_limit(
+            self.request.user, data['month'], data['limit'], data.get('category', budgets.OVERALL)
+        )
+
+    def perform_update(self, serializer):
+        try:
+            with sharding.atomic():
+                budget = serializer.save()
+                budgets.refresh_spent(Budget.objects.filter(pk=budget.pk))
+        except IntegrityError:
+            raise ValidationError({'detail': 'A budget for that month and category already exists.'})
+        budget.refresh_from_db(fields=['spent'])
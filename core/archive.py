@@ -0,0 +1,227 @@
+import json
+import re
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+
+from . import caching, sharding
+from .models import ArchivedTransaction, Transaction
+from .money import Money
+
+BLOCK_SIZE = 5000  # transactions per block at most
+COMPRESSION_LEVEL = 9
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+FIELDS = ('id', 'date', 'created_at', 'amount', 'is_income', 'category', 'note', 'recurring_id')
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _delta_encode(values):
+    return [b - a for a, b in zip([0, *values], values)]
+
+
+def _delta_decode(deltas):
+    total, values = 0, []
+    for delta in deltas:
+        total += delta
+        values.append(total)
+    return values
+
+
+def encode(rows):
+    """
+    Pack FIELDS-ordered rows from one month into a block payload: a JSON
+    object of columns, ids and timestamps delta-encoded against the previous
+    row, amounts in paise and days as day-of-month, then zlib-compressed.
+    Columns of near-identical small numbers and repeated categories are what
+    zlib compresses best.
+    """
+    rows = sorted(rows)  # by id
+    columns = {
+        'id': _delta_encode([row[0] for row in rows]),
+        'day': [row[1].day for row in rows],
+        'created_at': _delta_encode([(row[2] - EPOCH) // MICROSECOND for row in rows]),
+        'amount': [Money.coerce(row[3]).paise for row in rows],
+        'is_income': [int(row[4]) for row in rows],
+        'category': [row[5] for row in rows],
+        'note': [row[6] for row in rows],
+        'recurring_id': [row[7] for row in rows],
+    }
+    return zlib.compress(json.dumps(columns, separators=(',', ':')).encode(), COMPRESSION_LEVEL)
+
+
+def decode(block):
+    """The block's rows as FIELDS-ordered tuples, in id order."""
+    columns = json.loads(zlib.decompress(block.data))
+    return list(zip(
+        _delta_decode(columns['id']),
+        [block.month.replace(day=day) for day in columns['day']],
+        [EPOCH + stamp * MICROSECOND for stamp in _delta_decode(columns['created_at'])],
+        [Money(paise) for paise in columns['amount']],
+        [bool(flag) for flag in columns['is_income']],
+        columns['category'],
+        columns['note'],
+        columns['recurring_id'],
+    ))
+
+
+def append(user_id, month, rows):
+    """Write `rows` (FIELDS-ordered, all from `month`) as new blocks; returns them."""
+    rows = sorted(rows)
+    blocks = [
+        ArchivedTransaction(user_id=user_id, month=month, count=len(chunk), first_id=chunk[0][0],
+                            last_id=chunk[-1][0], data=encode(chunk))
+        for chunk in (rows[i:i + BLOCK_SIZE] for i in range(0, len(rows), BLOCK_SIZE))
+    ]
+    return ArchivedTransaction.objects.bulk_create(blocks)
+
+
+def archive_user(user_id, before, batch_size=1000):
+    """
+    Move `user_id`'s transactions dated before the month of `before` into
+    archive blocks, one short transaction per month. Rollups, budgets and the
+    ledger are left alone, since the rows still count. Returns (transactions,
+    blocks, compressed bytes).
+    """
+    cutoff = before.replace(day=1)
+    months = Transaction.objects.filter(user_id=user_id, date__lt=cutoff).dates('date', 'month')
+    moved = written = size = 0
+    for month in list(months):
+        with sharding.atomic():
+            rows = list(
+                Transaction.objects.filter(user_id=user_id, date__gte=month, date__lt=_next_month(month))
+                .order_by('id').values_list(*FIELDS)
+            )
+            blocks = append(user_id, month, rows)
+            ids = [row[0] for row in rows]
+            for i in range(0, len(ids), batch_size):
+                doomed = Transaction.objects.filter(pk__in=ids[i:i + batch_size])
+                doomed._raw_delete(doomed.db)
+        moved += len(rows)
+        written += len(blocks)
+        size += sum(len(block.data) for block in blocks)
+    if moved:
+        caching.invalidate(user_id)
+    return moved, written, size
+
+
+def users_with_rows_before(before):
+    """Ids of users on the current shard with transactions to archive before `before`'s month."""
+    return list(
+        Transaction.objects.filter(date__lt=before.replace(day=1))
+        .order_by('user_id').values_list('user_id', flat=True).distinct()
+    )
+
+
+def blocks(user, start=None, end=None, using=None):
+    """The user's archive blocks that can hold rows dated `start`..`end`, oldest month first."""
+    queryset = ArchivedTransaction.objects.using(using) if using else ArchivedTransaction.objects.all()
+    queryset = queryset.filter(user=user)
+    if start:
+        queryset = queryset.filter(month__gte=start.replace(day=1))
+    if end:
+        queryset = queryset.filter(month__lte=end)
+    return queryset.order_by('month', 'id')
+
+
+def flow_rows(queryset):
+    """(user_id, date, category, is_income, amount) for every archived row, as core.rollups takes them."""
+    for block in queryset.iterator(chunk_size=100):
+        for _, day, _, amount, is_income, category, _, _ in decode(block):
+            yield block.user_id, day, category, is_income, amount
+
+
+def day_totals(queryset):
+    """
+    {(date, is_income): [paise, count]} over every archived row, read from
+    the day, amount and is_income columns alone, so no row tuples, dates
+    or Money objects are built per row.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for block in queryset.iterator(chunk_size=100):
+        columns = json.loads(zlib.decompress(block.data))
+        month = defaultdict(lambda: [0, 0])
+        for day, paise, flag in zip(columns['day'], columns['amount'], columns['is_income']):
+            entry = month[(day, flag)]
+            entry[0] += paise
+            entry[1] += 1
+        for (day, flag), (paise, count) in month.items():
+            entry = totals[(block.month.replace(day=day), bool(flag))]
+            entry[0] += paise
+            entry[1] += count
+    return dict(totals)
+
+
+def to_transaction(user_id, row):
+    txn = Transaction(user_id=user_id, **dict(zip(FIELDS, row)))
+    txn._state.adding = False
+    return txn
+
+
+def matches(row, start=None, end=None, category=None, is_income=None, min_amount=None, max_amount=None):
+    _, day, _, amount, income, row_category, _, _ = row
+    return not (
+        (start and day < start) or (end and day > end)
+        or (category and row_category != category)
+        or (is_income is not None and income != is_income)
+        or (min_amount is not None and amount < min_amount)
+        or (max_amount is not None and amount > max_amount)
+    )
+
+
+def _by_month(queryset):
+    # All rows of each month, whichever blocks they're spread over.
+    for month, group in groupby(queryset.iterator(chunk_size=100), key=lambda block: block.month):
+        yield month, [row for block in group for row in decode(block)]
+
+
+def export_rows(user, start=None, end=None, category=None, using=None):
+    """Matching archived rows in (date, id) order, one month decoded at a time."""
+    for _, rows in _by_month(blocks(user, start, end, using)):
+        yield from sorted((row for row in rows if matches(row, start, end, category)),
+                          key=lambda row: (row[1], row[0]))
+
+
+def page(user, limit, after=None, **filters):
+    """
+    Up to `limit` archived transactions matching `filters`, newest first in
+    the API's (-date, -created_at, -id) order and past the keyset `after`
+    (date, created_at, id), as Transaction instances. Months are decoded
+    newest first until they've yielded enough rows.
+    """
+    end = filters.get('end')
+    if after:
+        end = min(end, after[0]) if end else after[0]
+    queryset = blocks(user, filters.get('start'), end).reverse()
+    found = []
+    for _, rows in _by_month(queryset):
+        if len(found) >= limit:
+            break
+        found.extend(row for row in rows
+                     if matches(row, **filters) and (after is None or (row[1], row[2], row[0]) < tuple(after)))
+    found.sort(key=lambda row: (row[1], row[2], row[0]), reverse=True)
+    return [to_transaction(user.pk, row) for row in found[:limit]]
+
+
+def search_rows(user, words, limit, start=None, end=None, **filters):
+    """
+    Archived transactions whose note has every word in `words` as a word
+    prefix, newest first, as Transaction instances with rank 0. This decodes
+    every block in the date range; the archive is cold, so that's the trade.
+    """
+    found = []
+    for _, rows in _by_month(blocks(user, start, end)):
+        for row in rows:
+            if matches(row, start, end, **filters):
+                tokens = re.findall(r'\w+', row[6].lower())
+                if all(any(token.startswith(word) for token in tokens) for word in words):
+                    found.append(row)
+    found.sort(key=lambda row: (row[1], row[0]), reverse=True)
+    results = [to_transaction(user.pk, row) for row in found[:limit]]
+    for txn in results:
+        txn.rank = 0.0
+    return results
@@ -0,0 +1,83 @@
+import copy
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+MAX_ENTRIES = 10000
+
+# (user id, backend path, session auth hash) -> (expires, user)
+_users = {}
+
+
+def _key(request):
+    session = request.session
+    try:
+        return session[auth.SESSION_KEY], session[auth.BACKEND_SESSION_KEY], session[auth.HASH_SESSION_KEY]
+    except KeyError:
+        return None
+
+
+def _remember(key, user, ttl):
+    now = time.monotonic()
+    if len(_users) >= MAX_ENTRIES:
+        for stale in [k for k, (expires, _) in list(_users.items()) if expires <= now]:
+            _users.pop(stale, None)
+        if len(_users) >= MAX_ENTRIES:
+            _users.clear()
+    _users[key] = (now + ttl, copy.copy(user))
+
+
+def get_user(request):
+    """
+    contrib.auth's get_user, answered for USER_CACHE_TTL seconds from a
+    per-process cache. Entries are keyed by the session's user id, backend
+    and auth hash, and only stored once Django has verified that hash
+    against the user, so a hit stands for a session that was valid a few
+    seconds ago. Saving the user or logging out forgets them in this
+    process; other processes see a password change or deactivation once
+    their entry expires. Each hit gets its own copy of the user.
+    """
+    ttl = getattr(settings, 'USER_CACHE_TTL', 0)
+    key = _key(request) if ttl > 0 else None
+    if key is None:
+        return auth.get_user(request)
+    hit = _users.get(key)
+    if hit and hit[0] > time.monotonic():
+        return copy.copy(hit[1])
+    user = auth.get_user(request)
+    # A session verified through SECRET_KEY_FALLBACKS gets a new hash; cache it next time.
+    if user.is_authenticated and request.session.get(auth.HASH_SESSION_KEY) == key[2]:
+        _remember(key, user, ttl)
+    return user
+
+
+def forget(user_id):
+    user_id = str(user_id)
+    for key in [key for key in list(_users) if key[0] == user_id]:
+        _users.pop(key, None)
+
+
+def _cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+async def _acached_user(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await sync_to_async(get_user)(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware, with request.user and request.auser() going through get_user above."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _cached_user(request))
+        request.auser = partial(_acached_user, request)
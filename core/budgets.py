@@ -0,0 +1,115 @@
+import calendar
+from collections import defaultdict
+
+from django.db import IntegrityError
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import caching, sharding
+from .bulk import increment_many
+from .fields import MoneyField
+from .models import Budget, MonthlySummary
+from .money import ZERO, Money
+
+OVERALL = ''  # Budget.category for the whole-month budget
+
+
+def _money(value):
+    return Value(value, output_field=MoneyField())
+
+
+def month_spend(user_id, month, category=OVERALL):
+    spend = MonthlySummary.objects.filter(user_id=user_id, month=month, is_income=False)
+    if category != OVERALL:
+        spend = spend.filter(category=category)
+    return spend.aggregate(total=Coalesce(Sum('total'), _money(ZERO)))['total']
+
+
+def set_limit(user, month, limit, category=OVERALL):
+    """
+    Create or update the user's budget for `month` (any day in it) and
+    `category`. The update-then-insert upsert relies on the unique
+    (user, month, category) constraint, so concurrent posts converge on one row.
+    """
+    lookup = {'user': user, 'month': month.replace(day=1), 'category': category}
+    with sharding.atomic():
+        if not Budget.objects.filter(**lookup).update(limit=_money(Money.coerce(limit))):
+            try:
+                with sharding.atomic():
+                    Budget.objects.create(
+                        limit=limit, spent=month_spend(user.pk, lookup['month'], category), **lookup
+                    )
+            except IntegrityError:
+                # Another request created the row first; apply our limit to it.
+                Budget.objects.filter(**lookup).update(limit=_money(Money.coerce(limit)))
+        caching.invalidate(user.pk)
+    return Budget.objects.get(**lookup)
+
+
+def add_spend(user_id, month, category, paise):
+    """Fold an expense delta into the category budget and the overall budget, if set."""
+    Budget.objects.filter(user_id=user_id, month=month, category__in=[category, OVERALL]).update(
+        spent=F('spent') + _money(Money(paise))
+    )
+
+
+def add_spend_batch(deltas):
+    """
+    add_spend for many keys at once, given rollups' {(user_id, month,
+    category, is_income): (paise, count)} deltas, as one executemany.
+    """
+    spend = defaultdict(int)
+    for (user_id, month, category, is_income), (paise, _) in deltas.items():
+        if not is_income:
+            spend[(user_id, month, category)] += paise
+            spend[(user_id, month, OVERALL)] += paise
+    increment_many(Budget, ['user', 'month', 'category'], ['spent'],
+                   ((key, (Money(paise),)) for key, paise in spend.items()))
+
+
+def refresh_spent(budgets):
+    """Recompute `spent` for the given Budget queryset from the monthly rollup."""
+    spend = (
+        MonthlySummary.objects.filter(user=OuterRef('user'), month=OuterRef('month'), is_income=False)
+        .order_by()
+        .values('user')
+        .annotate(total=Sum('total'))
+        .values('total')
+    )
+    budgets.filter(category=OVERALL).update(spent=Coalesce(Subquery(spend), _money(ZERO)))
+    budgets.exclude(category=OVERALL).update(
+        spent=Coalesce(Subquery(spend.filter(category=OuterRef('category'))), _money(ZERO))
+    )
+
+
+def burn(budget, today):
+    """
+    Spend-vs-limit status for a budget in the current month. The month-end
+    projection extrapolates the maintained `spent` at today's daily rate, so
+    it costs no query.
+    """
+    days = calendar.monthrange(today.year, today.month)[1]
+    projected = Money(budget.spent.paise * days // today.day)
+    if budget.spent > budget.limit:
+        status = 'over'
+    elif projected > budget.limit:
+        status = 'warning'
+    else:
+        status = 'ok'
+    return {
+        'category': budget.get_category_display() or 'Overall',
+        'limit': budget.limit,
+        'spent': budget.spent,
+        'remaining': budget.limit - budget.spent,
+        'projected': projected,
+        'percent': min(100, budget.spent.paise * 100 // budget.limit.paise) if budget.limit else 100,
+        'status': status,
+    }
+
+
+def month_status(user, today=None):
+    """Burn status for each of the user's budgets this month; one indexed query."""
+    today = today or timezone.localdate()
+    budgets = Budget.objects.filter(user=user, month=today.replace(day=1)).order_by('category')
+    return [burn(budget, today) for budget in budgets]
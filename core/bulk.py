@@ -0,0 +1,32 @@
+from django.db import connections, router
+
+
+def increment_many(model, key_fields, value_fields, rows):
+    """
+    Add to counters on many rows with one executemany of
+    UPDATE ... SET f = f + %s WHERE k = %s AND ..., the set-based
+    equivalent of a filter(...).update(f=F('f') + delta) per row. Each row is
+    (key values, delta values) in the order of `key_fields` and
+    `value_fields`; rows that don't exist are left alone. Values are prepared
+    by the model fields, so MoneyField deltas may be Money.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    db = router.db_for_write(model)
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    keys = [model._meta.get_field(name) for name in key_fields]
+    values = [model._meta.get_field(name) for name in value_fields]
+    sql = 'UPDATE {} SET {} WHERE {}'.format(
+        qn(model._meta.db_table),
+        ', '.join(f'{qn(field.column)} = {qn(field.column)} + %s' for field in values),
+        ' AND '.join(f'{qn(field.column)} = %s' for field in keys),
+    )
+    params = [
+        [field.get_db_prep_value(value, connection) for field, value in zip(values, deltas)]
+        + [field.get_db_prep_value(value, connection) for field, value in zip(keys, key)]
+        for key, deltas in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import sharding
+
+VERSION_KEY = 'money:version:{user_id}'
+DASHBOARD_KEY = 'money:dashboard:{user_id}:{version}:{day}'
+STATS_KEY = 'money:stats:{name}'
+
+
+def enabled():
+    # Off unless every process shares the default cache; see DATA_CACHE_ENABLED.
+    return getattr(settings, 'DATA_CACHE_ENABLED', False)
+
+
+def timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def get_version(user_id):
+    """
+    Current data version for a user: the time.time_ns() of their last write.
+    A missing version (first use, eviction, restart) is seeded from the clock,
+    so it can never collide with one that cached entries were stored under
+    earlier and, read as a timestamp, is never older than the real last write.
+    """
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(user_id):
+    cache.set(VERSION_KEY.format(user_id=user_id), time.time_ns(), timeout=None)
+
+
+def last_modified(user_id):
+    return datetime.fromtimestamp(get_version(user_id) / 1e9, tz=dt_timezone.utc)
+
+
+def invalidate(user_id):
+    """Bump the user's version once the current transaction on their shard commits."""
+    transaction.on_commit(lambda: bump_version(user_id), using=sharding.db())
+
+
+def _count(name):
+    key = STATS_KEY.format(name=name)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def stats():
+    hits = cache.get(STATS_KEY.format(name='hits'), 0)
+    misses = cache.get(STATS_KEY.format(name='misses'), 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else None}
+
+
+def get_or_build(user_id, build):
+    """
+    Return the cached dashboard data for `user_id`, calling `build()` on a
+    miss. Entries are keyed on the user's data version (and today's date, for
+    month-to-date figures), so writes invalidate by bumping the version and
+    stale entries simply age out. Without DATA_CACHE_ENABLED every call builds.
+    """
+    if not enabled():
+        return build()
+    key = DASHBOARD_KEY.format(user_id=user_id, version=get_version(user_id), day=timezone.localdate())
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return data
+    _count('misses')
+    data = build()
+    cache.set(key, data, timeout=timeout())
+    return data
+
+
+async def aget_or_build(user_id, build):
+    """get_or_build() for async views: `build` is a coroutine function."""
+    if not enabled():
+        return await build()
+    key = DASHBOARD_KEY.format(user_id=user_id, version=get_version(user_id), day=timezone.localdate())
+    data = await cache.aget(key)
+    if data is not None:
+        _count('hits')
+        return data
+    _count('misses')
+    data = await build()
+    await cache.aset(key, data, timeout=timeout())
+    return data
@@ -0,0 +1,122 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import archive, ledger
+from .analytics import EPOCH_ORDINAL
+from .models import DailyBalance, Transaction
+
+BUCKETS = ('day', 'week', 'month', 'year')
+DEFAULT_POINTS = 120
+MAX_POINTS = 1000
+MAX_SPAN_DAYS = 100 * 366  # the per-day arrays behind one series never get longer than this
+
+
+def _bucket_keys(days, bucket):
+    # Bucket number for each day (proleptic ordinals), non-decreasing.
+    if bucket == 'day':
+        return days - days[0]
+    if bucket == 'week':
+        return (days - 1) // 7  # ordinal 1 (0001-01-01) was a Monday
+    unit = 'M' if bucket == 'month' else 'Y'
+    return (days - EPOCH_ORDINAL).astype('datetime64[D]').astype(f'datetime64[{unit}]').astype(np.int64)
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    if bucket == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def _rupees(paise):
+    return (paise / 100).round(2).tolist()
+
+
+def date_range(user, start=None, end=None, today=None):
+    """
+    The (start, end) a series covers: `end` (default today) no later than
+    today, `start` (default the first day in the daily ledger) no earlier
+    than that first day, and at most MAX_SPAN_DAYS days in all.
+    """
+    today = today or timezone.localdate()
+    end = min(end or today, today)
+    first = DailyBalance.objects.filter(user=user).order_by('date').values_list('date', flat=True).first()
+    floor = date.fromordinal(max(1, end.toordinal() - MAX_SPAN_DAYS + 1))
+    if first:
+        floor = max(floor, first)
+    start = max(start or floor, floor)
+    return min(start, end), end
+
+
+def daily_flows(user, start, end):
+    """
+    Dense per-day (income, expense) paise arrays from `start` to `end`, from
+    one GROUP BY plus any archived months in the range.
+    """
+    size = (end - start).days + 1
+    income = np.zeros(size, dtype=np.int64)
+    expense = np.zeros(size, dtype=np.int64)
+    rows = (
+        Transaction.objects.filter(user=user, date__gte=start, date__lte=end)
+        .values_list('date', 'is_income')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    for day, is_income, total in rows:
+        (income if is_income else expense)[(day - start).days] += total.paise
+    for _, day, _, is_income, amount in archive.flow_rows(archive.blocks(user, start, end)):
+        if start <= day <= end:
+            (income if is_income else expense)[(day - start).days] += amount.paise
+    return income, expense
+
+
+def build_series(user, start=None, end=None, bucket='month', points=DEFAULT_POINTS, today=None):
+    """
+    Income, expense, net and balance bucketed by day, week, month or year
+    between `start` and `end`, as parallel lists for a chart. Either left
+    out is filled in by date_range(); requests come through ChartForm, which
+    clamps both the same way.
+
+    Sums come from one GROUP BY over the (user, is_income, date, amount)
+    index, and balances from the daily ledger's opening balance plus the
+    running net, so the work is two queries and a few array passes. When
+    there are more buckets than `points`, consecutive buckets are merged
+    into equal groups: flows are summed, so totals are preserved, and the
+    balance keeps each group's closing value plus its min and max, so spikes
+    still show. The payload never exceeds `points` entries.
+    """
+    if start is None or end is None:
+        start, end = date_range(user, start, end, today)
+    income, expense = daily_flows(user, start, end)
+    net = income - expense
+    opening = ledger.balance_at(user, start - timedelta(days=1)).paise if start > date.min else 0
+    balance = opening + np.cumsum(net)
+
+    days = np.arange(start.toordinal(), end.toordinal() + 1, dtype=np.int64)
+    keys = _bucket_keys(days, bucket)
+    keys -= keys[0]
+    buckets = int(keys[-1]) + 1
+    group = -(-buckets // points)  # ceiling division
+    keys //= group
+    # Index of the first day in each point; reduceat sums/mins over each run.
+    edges = np.flatnonzero(np.diff(keys, prepend=-1))
+    closing = np.append(edges[1:], len(days)) - 1
+    return {
+        'bucket': bucket,
+        'start': start,
+        'end': end,
+        'group': group,
+        'labels': [_bucket_start(date.fromordinal(int(days[i])), bucket) for i in edges],
+        'income': _rupees(np.add.reduceat(income, edges)),
+        'expense': _rupees(np.add.reduceat(expense, edges)),
+        'net': _rupees(np.add.reduceat(net, edges)),
+        'balance': _rupees(balance[closing]),
+        'balance_min': _rupees(np.minimum.reduceat(balance, edges)),
+        'balance_max': _rupees(np.maximum.reduceat(balance, edges)),
+    }
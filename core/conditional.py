@@ -0,0 +1,48 @@
+import hashlib
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.middleware.csrf import get_token
+from django.template.loader import get_template
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from . import caching
+
+_template_versions = {}
+
+
+def template_version(template_name):
+    # Hash of the template source and the static manifest, read once per process:
+    # a page cached against old bundle names must not revalidate after a deploy.
+    if template_name not in _template_versions:
+        origin = get_template(template_name).origin
+        with open(origin.name, 'rb') as source:
+            digest = hashlib.sha1(source.read())
+        digest.update(getattr(staticfiles_storage, 'manifest_hash', '').encode())
+        _template_versions[template_name] = digest.hexdigest()[:12]
+    return _template_versions[template_name]
+
+
+def conditional_page(template_name, uses_data=True):
+    """
+    ETag/Last-Modified for a per-user page rendered from `template_name`.
+    Validators come from the cached data version (bumped on every Transaction,
+    Budget or SavingsGoal write, see core.caching), the template source and the CSRF token
+    embedded in the page's forms, so a revalidation that ends in 304 needs no
+    database work beyond authentication. Pages that use data get no
+    validators unless DATA_CACHE_ENABLED, since the version is only as
+    shared as the default cache.
+    """
+    def etag(request, *args, **kwargs):
+        if uses_data and not caching.enabled():
+            return None
+        get_token(request)  # make sure a CSRF secret exists; the page embeds tokens from it
+        parts = [str(request.user.pk), template_version(template_name), request.META['CSRF_COOKIE']]
+        if uses_data:
+            parts += [str(caching.get_version(request.user.pk)), timezone.localdate().isoformat()]
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return caching.last_modified(request.user.pk) if uses_data and caching.enabled() else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,94 @@
+import csv
+import heapq
+import json
+
+from asgiref.sync import sync_to_async
+
+from . import sharding
+from .models import Transaction
+from .money import MoneyJSONEncoder
+
+EXPORT_FIELDS = ('date', 'type', 'category', 'amount', 'note')
+CHUNK_SIZE = 2000
+LINES_PER_CHUNK = 500  # rendered lines joined into one response chunk
+_DONE = object()
+
+
+class Echo:
+    # csv.writer wants a file; hand each formatted line straight back instead.
+    def write(self, value):
+        return value
+
+
+def export_queryset(user, start=None, end=None, category=None):
+    # Pin the shard now: a streamed body is read after the request's routing context ends.
+    queryset = Transaction.objects.using(sharding.db()).filter(user=user)
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    if category:
+        queryset = queryset.filter(category=category)
+    return queryset.order_by('date', 'id')
+
+
+def iter_rows(queryset, archived=(), chunk_size=CHUNK_SIZE):
+    """
+    Yield (date, type, category, amount, note) tuples using a server-side
+    iterator over values_list, so no model instances are built and only one
+    chunk of rows is held at a time. `archived` rows (core.archive's
+    export_rows, already in (date, id) order) are merged in as they stream.
+    """
+    rows = queryset.values_list('date', 'id', 'is_income', 'category', 'amount', 'note')
+    archived = ((row[1], row[0], row[4], row[5], row[3], row[6]) for row in archived)
+    for day, _, is_income, category, amount, note in heapq.merge(rows.iterator(chunk_size=chunk_size), archived):
+        yield day, 'income' if is_income else 'expense', category, amount, note
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=MoneyJSONEncoder) + '\n'
+
+
+FORMATS = {
+    'csv': ('text/csv', csv_lines),
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+}
+
+
+def chunks(lines, size=LINES_PER_CHUNK):
+    """Join rendered lines into chunks of `size`, so each write carries more than one row."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch.clear()
+    if batch:
+        yield ''.join(batch)
+
+
+async def aiter_chunks(iterator):
+    """
+    Stream a sync iterator of chunks to an ASGI server. Given a sync
+    iterator, Django 5.0's ASGI handler reads the whole body into a list
+    before sending any of it; here each chunk is pulled through
+    sync_to_async instead. thread_sensitive keeps every step on the
+    request's one sync thread, so the server-side cursor stays on the
+    connection that opened it, and memory stays at one chunk.
+    """
+    step = sync_to_async(next)
+    try:
+        while (chunk := await step(iterator, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            await sync_to_async(close)()  # client went away: release the cursor now
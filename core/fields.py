@@ -0,0 +1,86 @@
+from decimal import InvalidOperation
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.functional import cached_property
+
+from .money import Money
+
+
+class MoneyAttribute(DeferredAttribute):
+    # Normalise assignments (form Decimals, API strings) to Money so instance
+    # attributes are always Money; values that don't parse are left for
+    # validation or get_prep_value to reject, as DecimalField would.
+    def __set__(self, instance, value):
+        if value is not None and not isinstance(value, Money):
+            try:
+                value = Money.from_rupees(value)
+            except (InvalidOperation, TypeError, ValueError):
+                pass
+        instance.__dict__[self.field.attname] = value
+
+
+class MoneyField(models.BigIntegerField):
+    """
+    A rupee amount stored as a BIGINT count of paise and returned as Money.
+    Database sums are exact integer sums, and `max_digits` bounds the rupee
+    value the same way DecimalField(max_digits, decimal_places=2) did.
+    """
+    description = "Amount of money, stored as integer paise"
+    descriptor_class = MoneyAttribute
+
+    def __init__(self, *args, max_digits=None, **kwargs):
+        self.max_digits = max_digits
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.max_digits is not None:
+            kwargs['max_digits'] = self.max_digits
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # BigIntegerField's range validators compare in paise; max_digits is the real bound.
+        validators = [*self.default_validators, *self._validators]
+        if self.max_digits is not None:
+            validators.append(lambda value: _check_digits(value, self.max_digits - 2))
+        return validators
+
+    def from_db_value(self, value, expression, connection):
+        # PostgreSQL returns SUM(bigint) as numeric, hence int().
+        return None if value is None else Money(int(value))
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Money):
+            return value
+        try:
+            return Money.from_rupees(value)
+        except (InvalidOperation, TypeError, ValueError):
+            raise exceptions.ValidationError(
+                self.error_messages['invalid'], code='invalid', params={'value': value},
+            )
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return None
+        return self.to_python(value).paise
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            'form_class': forms.DecimalField,
+            'max_digits': self.max_digits,
+            'decimal_places': 2,
+            **kwargs,
+        })
+
+
+def _check_digits(value, whole_digits):
+    if abs(value.paise) >= 10 ** (whole_digits + 2):
+        raise exceptions.ValidationError(
+            "Ensure that there are no more than %(max)s digits before the decimal point.",
+            code='max_whole_digits', params={'max': whole_digits},
+        )
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from . import charts
 from .models import Transaction, SavingsGoal, Category
 
 class TransactionForm(forms.ModelForm):
@@ -10,6 +11,13 @@ class TransactionForm(forms.ModelForm):
     model = Transaction
     fields = ['category', 'amount', 'note', 'date']
 
+   def clean_amount(self):
+    # The income/expense choice carries the sign, as in the API and CSV import.
+    amount = self.cleaned_data['amount']
+    if amount <= 0:
+     raise forms.ValidationError("Must be positive.")
+    return amount
+
 class CategoryForm(forms.Form):
   # Since Category is TextChoices, we can't use ModelForm for it efficiently unless we wrap it.
   # But the original code was confused. I will make a simple form that mimics what might be needed,
@@ -48,3 +56,31 @@ class RegisterForm(UserCreationForm):
   class Meta:
     model = User
     fields = ("username", "email")
+
+class ImportTransactionsForm(forms.Form):
+  file = forms.FileField(help_text="CSV with date, amount (or debit/credit), category, note and type columns.")
+
+class ExportForm(forms.Form):
+  format = forms.ChoiceField(choices=[('csv', 'CSV'), ('ndjson', 'JSON Lines')], required=False)
+  start = forms.DateField(required=False)
+  end = forms.DateField(required=False)
+  category = forms.ChoiceField(choices=[('', 'All')] + Category.choices, required=False)
+
+class ChartForm(forms.Form):
+  bucket = forms.ChoiceField(choices=[(name, name.title()) for name in charts.BUCKETS], required=False)
+  start = forms.DateField(required=False)
+  end = forms.DateField(required=False)
+  points = forms.IntegerField(min_value=2, max_value=charts.MAX_POINTS, required=False)
+
+  def __init__(self, *args, user, **kwargs):
+    super().__init__(*args, **kwargs)
+    self.user = user
+
+  def clean(self):
+    data = super().clean()
+    if data.get('start') and data.get('end') and data['start'] > data['end']:
+      raise forms.ValidationError("start must not be after end.")
+    if not self.errors:
+      # Clamp to the user's ledger and today, so out-of-range dates never size the arrays.
+      data['start'], data['end'] = charts.date_range(self.user, data.get('start'), data.get('end'))
+    return data
@@ -0,0 +1,168 @@
+import csv
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from . import rollups, sharding
+from .models import Category, Transaction
+from .money import Money
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 50
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d %b %Y')
+
+# Header aliases seen in bank statement exports, mapped to our column names.
+COLUMN_ALIASES = {
+    'date': 'date', 'transaction date': 'date', 'txn date': 'date', 'value date': 'date',
+    'amount': 'amount',
+    'category': 'category',
+    'note': 'note', 'description': 'note', 'narration': 'note', 'remarks': 'note',
+    'type': 'type',
+    'debit': 'debit', 'withdrawal': 'debit', 'withdrawal amt.': 'debit',
+    'credit': 'credit', 'deposit': 'credit', 'deposit amt.': 'credit',
+}
+
+_amount_field = Transaction._meta.get_field('amount')
+_note_length = Transaction._meta.get_field('note').max_length
+_categories = {value: value for value in Category.values}
+_categories.update({label.lower(): value for value, label in Category.choices})
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportResult:
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []  # (line number, message), capped at MAX_REPORTED_ERRORS
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def _parse_amount(raw):
+    raw = (raw or '').replace(',', '').replace('₹', '').strip()
+    if not raw:
+        return None
+    try:
+        amount = Decimal(raw)
+    except InvalidOperation:
+        raise RowError(f"invalid amount {raw!r}")
+    if not amount.is_finite():
+        raise RowError(f"invalid amount {raw!r}")
+    return amount
+
+
+def _parse_date(raw):
+    raw = (raw or '').strip()
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS[1:]:
+        try:
+            return datetime.strptime(raw, fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f"invalid date {raw!r}")
+
+
+def parse_row(row):
+    """
+    Turn one CSV row (already keyed by our column names) into unsaved
+    Transaction field values. Amounts are either `amount` plus an optional
+    `type` of income/expense (a negative amount means expense), or
+    bank-statement style `debit`/`credit` columns.
+    """
+    amount = _parse_amount(row.get('amount'))
+    if amount is not None:
+        kind = (row.get('type') or '').strip().lower()
+        if kind not in ('', 'income', 'expense', 'credit', 'debit'):
+            raise RowError(f"invalid type {kind!r}")
+        is_income = kind in ('income', 'credit')
+        if amount < 0:
+            if is_income:
+                raise RowError("income amount cannot be negative")
+            amount = -amount
+    else:
+        debit, credit = _parse_amount(row.get('debit')), _parse_amount(row.get('credit'))
+        if bool(debit) == bool(credit):
+            raise RowError("expected exactly one of debit or credit")
+        is_income, amount = (True, credit) if credit else (False, debit)
+
+    # Round to paise the way every other write does before judging the amount,
+    # so 0.001 is rejected rather than imported as 0.00.
+    amount = Money.from_rupees(amount)
+    if amount.paise <= 0:
+        raise RowError("amount must be positive")
+    if amount.paise >= 10 ** _amount_field.max_digits:
+        raise RowError(f"amount {amount} is too large")
+
+    category_raw = (row.get('category') or '').strip().lower()
+    category = _categories.get(category_raw or Category.OTHER)
+    if category is None:
+        raise RowError(f"unknown category {category_raw!r}")
+
+    return {
+        'date': _parse_date(row.get('date')),
+        'amount': amount,
+        'is_income': is_income,
+        'category': category,
+        'note': (row.get('note') or '').strip()[:_note_length],
+    }
+
+
+def _flush(batch, result):
+    with sharding.atomic():
+        Transaction.objects.bulk_create(batch)
+        rollups.apply_transactions(batch)
+    result.imported += len(batch)
+    batch.clear()
+
+
+def import_csv(user, lines, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream-parse CSV text `lines` (any iterable of str, e.g. an open file) and
+    insert valid rows for `user`. Rows are written with bulk_create in batches
+    of `batch_size`, each batch in its own transaction together with its
+    rollup update, so memory stays bounded by one batch whatever the file size.
+    Raises ValueError if the header lacks the required columns.
+    """
+    result = ImportResult(batch_size)
+    started = time.perf_counter()
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        result.elapsed = time.perf_counter() - started
+        return result
+    columns = [COLUMN_ALIASES.get(name.strip().lower()) for name in header]
+    if 'date' not in columns or not ({'amount', 'debit', 'credit'} & set(columns)):
+        raise ValueError("CSV header must include a date column and amount or debit/credit columns")
+
+    batch = []
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        row = {name: value for name, value in zip(columns, values) if name}
+        try:
+            batch.append(Transaction(user=user, **parse_row(row)))
+        except RowError as exc:
+            result.reject(reader.line_num, str(exc))
+            continue
+        if len(batch) >= batch_size:
+            _flush(batch, result)
+    if batch:
+        _flush(batch, result)
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,182 @@
+from collections import defaultdict
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.db.models import Sum
+
+from . import archive, sharding
+from .bulk import increment_many
+from .models import ArchivedTransaction, DailyBalance, Transaction
+from .money import ZERO, Money
+
+
+def _deltas(rows, sign):
+    # Signed net change per (user_id, date): income adds, expenses subtract.
+    deltas = defaultdict(int)
+    for user_id, day, category, is_income, amount in rows:
+        paise = Money.coerce(amount).paise * sign
+        deltas[(user_id, day)] += paise if is_income else -paise
+    return {key: paise for key, paise in deltas.items() if paise}
+
+
+def apply_rows(rows, sign=1):
+    """
+    Fold saved (sign=1) or deleted (sign=-1) transaction rows into the daily
+    ledger. Each row is a (user_id, date, category, is_income, amount) tuple,
+    as for core.rollups. Works for back-dated rows too, in a fixed number of
+    statements however many users and days the batch touches:
+
+    1. every later day's running balance shifts by the delta (one
+       executemany of range UPDATEs over the (user, date) index);
+    2. days that already have a row get the delta added to `net`;
+    3. new days are inserted in date order, each taking its balance from
+       the latest earlier row (already shifted, or inserted just before).
+
+    The affected users are locked first so concurrent back-dated writes for
+    the same user can't interleave steps 1 and 3.
+    """
+    deltas = _deltas(rows, sign)
+    if not deltas:
+        return
+    users = sorted({user_id for user_id, _ in deltas})
+    db = router.db_for_write(DailyBalance)
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    table = qn(DailyBalance._meta.db_table)
+    date_field = DailyBalance._meta.get_field('date')
+    money_field = DailyBalance._meta.get_field('balance')
+
+    def prep(user_id, day, paise):
+        return (user_id, date_field.get_db_prep_value(day, connection),
+                money_field.get_db_prep_value(Money(paise), connection))
+
+    with transaction.atomic(using=db):
+        _lock_users(connection, users)
+        existing = set(
+            DailyBalance.objects.using(db)
+            .filter(user_id__in=users, date__in={day for _, day in deltas})
+            .values_list('user_id', 'date')
+        )
+        missing = sorted(deltas.keys() - existing)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {table} SET {qn("balance")} = {qn("balance")} + %s '
+                f'WHERE {qn("user_id")} = %s AND {qn("date")} >= %s',
+                [(money, user_id, day) for user_id, day, money in (prep(*key, paise) for key, paise in deltas.items())],
+            )
+            increment_many(DailyBalance, ['user', 'date'], ['net'],
+                           (((user_id, day), (Money(paise),)) for (user_id, day), paise in deltas.items()
+                            if (user_id, day) in existing))
+            cursor.executemany(
+                f'INSERT INTO {table} ({qn("user_id")}, {qn("date")}, {qn("net")}, {qn("balance")}) '
+                f'VALUES (%s, %s, %s, %s + COALESCE((SELECT {qn("balance")} FROM {table} '
+                f'WHERE {qn("user_id")} = %s AND {qn("date")} < %s ORDER BY {qn("date")} DESC LIMIT 1), 0))',
+                [(user_id, day, money, money, user_id, day)
+                 for user_id, day, money in (prep(*key, deltas[key]) for key in missing)],
+            )
+        # Days whose transactions were all deleted carry nothing; drop them.
+        DailyBalance.objects.using(db).filter(
+            user_id__in=users, date__in={day for _, day in existing}, net=0
+        ).delete()
+
+
+def _lock_users(connection, users):
+    if connection.alias == router.db_for_write(User):
+        # NO KEY UPDATE where supported, so inserts referencing the users aren't blocked.
+        list(User.objects.using(connection.alias)
+             .select_for_update(no_key=connection.features.has_select_for_no_key_update)
+             .filter(pk__in=users).order_by('pk').values_list('pk', flat=True))
+    elif connection.vendor == 'postgresql':
+        # A shard has no user rows to lock; take transaction-scoped advisory locks instead.
+        with connection.cursor() as cursor:
+            for user_id in users:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [user_id])
+    # Other shards are SQLite files, whose single writer already serializes us.
+
+
+def balance_at(user, day):
+    """The user's balance at the end of `day`: one index lookup."""
+    row = (
+        DailyBalance.objects.filter(user=user, date__lte=day)
+        .order_by('-date').values_list('balance', flat=True).first()
+    )
+    return row if row is not None else ZERO
+
+
+def current_balance(user):
+    """Balance over the whole history, future-dated transactions included."""
+    row = DailyBalance.objects.filter(user=user).order_by('-date').values_list('balance', flat=True).first()
+    return row if row is not None else ZERO
+
+
+def series(user, start, end):
+    """
+    (date, balance) at the end of each day from `start` to `end` that had
+    transactions, preceded by the opening balance on `start`. One range scan
+    plus one lookup.
+    """
+    points = [(start, balance_at(user, start))]
+    points.extend(
+        DailyBalance.objects.filter(user=user, date__gt=start, date__lte=end)
+        .order_by('date').values_list('date', 'balance')
+    )
+    return points
+
+
+def expected_rows(queryset=None, archived=None):
+    """
+    Ledger rows recomputed from scratch: {(user_id, date): (net, balance)},
+    counting the `archived` blocks' rows too (every block when neither is
+    given).
+    """
+    if queryset is None:
+        queryset = Transaction.objects.all()
+        archived = ArchivedTransaction.objects.all() if archived is None else archived
+    rows = (
+        queryset.values('user_id', 'date', 'is_income')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    net = defaultdict(int)
+    for row in rows:
+        net[(row['user_id'], row['date'])] += row['total'].paise if row['is_income'] else -row['total'].paise
+    if archived is not None:
+        for key, paise in _deltas(archive.flow_rows(archived), 1).items():
+            net[key] += paise
+    expected, by_user = {}, defaultdict(list)
+    for (user_id, day), paise in sorted(net.items()):
+        if paise:
+            by_user[user_id].append((day, paise))
+    for user_id, days in by_user.items():
+        for (day, paise), balance in zip(days, accumulate(paise for _, paise in days)):
+            expected[(user_id, day)] = (Money(paise), Money(balance))
+    return expected
+
+
+def stored_rows(queryset=None):
+    queryset = DailyBalance.objects.all() if queryset is None else queryset
+    return {(r.user_id, r.date): (r.net, r.balance) for r in queryset.exclude(net=0)}
+
+
+def find_drift(expected, stored):
+    return sorted(key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key))
+
+
+def rebuild(users=None, batch_size=1000):
+    """Replace the ledger for `users` (or everyone) with freshly computed rows."""
+    txns = Transaction.objects.all()
+    archived = ArchivedTransaction.objects.all()
+    ledger = DailyBalance.objects.all()
+    if users is not None:
+        txns = txns.filter(user__in=users)
+        archived = archived.filter(user__in=users)
+        ledger = ledger.filter(user__in=users)
+    rows = [
+        DailyBalance(user_id=user_id, date=day, net=net, balance=balance)
+        for (user_id, day), (net, balance) in expected_rows(txns, archived).items()
+    ]
+    with sharding.atomic():
+        ledger.delete()
+        DailyBalance.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
@@ -0,0 +1,41 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import archive, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Move transactions from months that ended before --before into compressed archive blocks. "
+        "Totals, budgets and balances are unchanged, and listings, exports, search and reports still include them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat, required=True,
+                            help="ISO date; every whole month before this date's month is archived.")
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help="Only this user id (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per delete statement.")
+
+    def handle(self, *args, before, users=None, batch_size=1000, **options):
+        if before.replace(day=1) > timezone.localdate().replace(day=1):
+            raise CommandError("--before must not be later than the current month; only closed months are archived.")
+        started = time.perf_counter()
+        moved = written = size = archived_users = 0
+        for _ in sharding.each_shard():
+            for user_id in archive.users_with_rows_before(before):
+                if users and user_id not in users:
+                    continue
+                rows, blocks, nbytes = archive.archive_user(user_id, before, batch_size)
+                self.stdout.write(f"user={user_id}: {rows} transactions in {blocks} blocks ({nbytes / 1024:.1f} KiB)")
+                archived_users += 1
+                moved += rows
+                written += blocks
+                size += nbytes
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} transactions of {archived_users} users into {written} blocks "
+            f"({size / 1024:.1f} KiB) in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core import importer, sharding
+
+
+class Command(BaseCommand):
+    help = "Stream-import transactions for one user from a CSV or bank statement export."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import.")
+        parser.add_argument('--user', required=True, help="Username that will own the rows.")
+        parser.add_argument('--batch-size', type=int, default=importer.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, path, user, batch_size, encoding, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+        try:
+            owner = User.objects.get(username=user)
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {user!r}.")
+
+        try:
+            with open(path, encoding=encoding, errors='replace', newline='') as lines, sharding.for_user(owner.pk):
+                result = importer.import_csv(owner, lines, batch_size=batch_size)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        if result.rejected > len(result.errors):
+            self.stderr.write(f"... {result.rejected - len(result.errors)} more rejected rows not shown")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.imported} rows in {result.elapsed:.2f}s "
+            f"({result.rows_per_second:,.0f} rows/sec), rejected {result.rejected}, "
+            f"batch size {result.batch_size}."
+        ))
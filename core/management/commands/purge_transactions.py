@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core import purge
+
+
+class Command(BaseCommand):
+    help = "Finish pending or stalled clear-data purges in small, separately committed chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Rows per chunk (default: TRANSACTION_PURGE_CHUNK_SIZE).")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between chunks so other writers get a turn.")
+
+    def handle(self, *args, chunk_size=None, pause=0.0, **options):
+        jobs = purge.run_pending(size=chunk_size, pause=pause)
+        for job in jobs:
+            self.stdout.write(f"user={job.user_id}: deleted {job.deleted} transactions")
+        self.stdout.write(self.style.SUCCESS(f"Finished {len(jobs)} purge job(s)."))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import rebalance, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Move every user whose rows sit on a database other than their shard "
+        "(after adding a shard, or when first turning sharding on) to that shard. "
+        "Run with writes stopped: moved rows get new ids."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the users that would move.")
+        parser.add_argument('--batch-size', type=int, default=rebalance.BATCH_SIZE)
+
+    def handle(self, *args, dry_run=False, batch_size=rebalance.BATCH_SIZE, **options):
+        started = time.perf_counter()
+        moved_users = moved_rows = skipped = 0
+        for source in rebalance.sources():
+            for user_id in rebalance.misplaced(source):
+                target = sharding.shard_for(user_id)
+                if dry_run:
+                    self.stdout.write(f"user={user_id} {source} -> {target}")
+                    moved_users += 1
+                    continue
+                moved = rebalance.move_user(user_id, source, target, batch_size)
+                if moved is None:
+                    skipped += 1
+                    self.stderr.write(f"user={user_id}: unfinished purge on {source}, skipped")
+                    continue
+                moved_users += 1
+                moved_rows += moved
+                self.stdout.write(f"user={user_id} {source} -> {target}: {moved} transactions")
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved_users} users ({moved_rows} transactions), skipped {skipped}, "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from core import ledger, rollups, sharding
+from core.models import ArchivedTransaction, DailyBalance, MonthlySummary, Transaction
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MonthlySummary rollup and DailyBalance ledger from Transaction rows (archived ones included), or check them for drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help="Only this user id (repeatable).")
+        parser.add_argument('--check', action='store_true',
+                            help="Report drift without writing; exits non-zero if any is found.")
+
+    def handle(self, *args, users=None, check=False, **options):
+        drift, ledger_drift, written = [], [], 0
+        for _ in sharding.each_shard():
+            txns = Transaction.objects.all()
+            archived = ArchivedTransaction.objects.all()
+            summaries = MonthlySummary.objects.all()
+            balances = DailyBalance.objects.all()
+            if users:
+                txns = txns.filter(user_id__in=users)
+                archived = archived.filter(user_id__in=users)
+                summaries = summaries.filter(user_id__in=users)
+                balances = balances.filter(user_id__in=users)
+            drift += rollups.find_drift(rollups.expected_rows(txns, archived), rollups.stored_rows(summaries))
+            ledger_drift += ledger.find_drift(ledger.expected_rows(txns, archived), ledger.stored_rows(balances))
+            if not check:
+                written += rollups.rebuild(users)
+
+        for user_id, month, category, is_income in drift:
+            kind = 'income' if is_income else 'expense'
+            self.stdout.write(f"drift: user={user_id} month={month:%Y-%m} category={category} {kind}")
+        for user_id, day in ledger_drift:
+            self.stdout.write(f"drift: user={user_id} ledger day={day:%Y-%m-%d}")
+
+        if check:
+            if drift or ledger_drift:
+                self.stderr.write(self.style.ERROR(
+                    f"{len(drift)} summary rows and {len(ledger_drift)} ledger days out of date."
+                ))
+                raise SystemExit(1)
+            self.stdout.write(self.style.SUCCESS("Monthly summaries and the daily ledger are up to date."))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} summary rows ({len(drift)} were out of date) "
+            f"and the daily ledger ({len(ledger_drift)} days were out of date)."
+        ))
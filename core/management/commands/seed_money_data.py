@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    help = "Generate users with realistic transaction, budget and savings-goal histories."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--transactions', type=int, default=1000, help="Transactions per user.")
+        parser.add_argument('--months', type=int, default=12, help="Months of history per user.")
+        parser.add_argument('--prefix', default='demo', help="Username prefix; numbering continues from existing users.")
+        parser.add_argument('--password', default='demo-pass')
+        parser.add_argument('--seed', type=int, default=None, help="Random seed for reproducible data.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['months'] < 1 or options['transactions'] < 0:
+            raise CommandError("--users and --months must be positive and --transactions non-negative.")
+        started = time.perf_counter()
+        owners = seeding.seed(
+            users=options['users'],
+            transactions=options['transactions'],
+            months=options['months'],
+            prefix=options['prefix'],
+            password=options['password'],
+            random_seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - started
+        total = len(owners) * options['transactions']
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(owners)} users ({owners[0].username}..{owners[-1].username}) "
+            f"with ~{total} transactions in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Timings for the request currently being handled, if metrics are on.
+current = ContextVar('request_metrics', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.statements = Counter()
+        # core.aio can run a request's lookups on several threads at once.
+        self.lock = threading.Lock()
+
+    @property
+    def repeated_queries(self):
+        # Identical SQL (before parameters) run more than once is the N+1 signature.
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: time and count every statement.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.sql_ms += elapsed
+                self.queries += 1
+                self.statements[sql] += 1
+
+
+class RollingStats:
+    """Last `size` samples per view, kept in process memory."""
+
+    def __init__(self, size=None):
+        self.size = size or getattr(settings, 'REQUEST_METRICS_WINDOW', 1000)
+        self.samples = defaultdict(lambda: deque(maxlen=self.size))
+        self.lock = threading.Lock()
+
+    def record(self, view, wall_ms, sql_ms, template_ms, queries, repeated):
+        with self.lock:
+            self.samples[view].append((wall_ms, sql_ms, template_ms, queries, repeated))
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def summary(self):
+        with self.lock:
+            snapshot = {view: list(samples) for view, samples in self.samples.items()}
+        return {view: _summarize(samples) for view, samples in sorted(snapshot.items())}
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summarize(samples):
+    wall = sorted(s[0] for s in samples)
+    n = len(samples)
+    return {
+        'count': n,
+        'wall_ms': {
+            'p50': round(_percentile(wall, 0.50), 2),
+            'p95': round(_percentile(wall, 0.95), 2),
+            'p99': round(_percentile(wall, 0.99), 2),
+            'max': round(wall[-1], 2),
+        },
+        'sql_ms_mean': round(sum(s[1] for s in samples) / n, 2),
+        'template_ms_mean': round(sum(s[2] for s in samples) / n, 2),
+        'queries_mean': round(sum(s[3] for s in samples) / n, 2),
+        'queries_max': max(s[3] for s in samples),
+        'repeated_queries_max': max(s[4] for s in samples),
+    }
+
+
+stats = RollingStats()
+
+_patched = False
+_connections_patched = False
+
+
+def instrument_templates():
+    """
+    Time top-level template renders. Wraps the Django template backend's
+    render once per process; it only records while a request is being measured.
+    """
+    global _patched
+    if _patched:
+        return
+    from django.template.backends.django import Template
+
+    original = Template.render
+
+    def render(self, *args, **kwargs):
+        timings = current.get()
+        if timings is None:
+            return original(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            timings.template_ms += (time.perf_counter() - started) * 1000
+
+    Template.render = render
+    _patched = True
+
+
+def record_query(execute, sql, params, many, context):
+    # execute_wrapper installed on every connection; counts only while a request is measured.
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def _install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_connections():
+    """
+    Count queries on every connection, not just the request thread's: the
+    lookups core.aio runs on other threads carry the request's `current`
+    with them (sync_to_async copies the context), so they land in its
+    timings too. New connections get the wrapper as they open; the calling
+    thread's are wrapped at once.
+    """
+    global _connections_patched
+    from django.db import connections
+
+    if not _connections_patched:
+        from django.db.backends.signals import connection_created
+
+        connection_created.connect(lambda sender, connection, **kwargs: _install(connection), weak=False)
+        _connections_patched = True
+    for alias in connections:
+        _install(connections[alias])
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+
+
+class RequestMetricsMiddleware:
+    """
+    Opt-in (REQUEST_METRICS_ENABLED) per-view cost tracking: query count,
+    SQL time, template render time and wall time. Each response gets a
+    Server-Timing header, and every sample lands in the in-process rolling
+    stats that staff can read at /metrics/.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        timings = metrics.RequestTimings()
+        token = metrics.current.set(timings)
+        try:
+            metrics.instrument_connections()
+            response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+
+        wall_ms = (time.perf_counter() - timings.started) * 1000
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.stats.record(view, wall_ms, timings.sql_ms, timings.template_ms,
+                             timings.queries, timings.repeated_queries)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.sql_ms:.2f};desc="{timings.queries} queries, {timings.repeated_queries} repeated"',
+            f'tpl;dur={timings.template_ms:.2f}',
+            f'total;dur={wall_ms:.2f}',
+        ])
+        return response
+
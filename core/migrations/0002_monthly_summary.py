@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-18 18:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_summaries(apps, schema_editor):
+    Transaction = apps.get_model('core', 'Transaction')
+    MonthlySummary = apps.get_model('core', 'MonthlySummary')
+    db = schema_editor.connection.alias
+    rows = (
+        Transaction.objects.using(db).annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category', 'is_income')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    MonthlySummary.objects.using(db).bulk_create(
+        (MonthlySummary(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('category', models.CharField(choices=[('food', 'Food'), ('transport', 'Transport'), ('bills', 'Bills'), ('entertainment', 'Entertainment'), ('savings', 'Savings'), ('other', 'Other')], default='other', max_length=32)),
+                ('is_income', models.BooleanField(default=False)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='monthlysummary',
+            constraint=models.UniqueConstraint(fields=('user', 'month', 'category', 'is_income'), name='unique_monthly_summary'),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0 on 2026-10-18 19:05
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+import core.fields
+
+# (model, field, max_digits) for every rupee column moving to integer paise.
+MONEY_COLUMNS = [
+    ('transaction', 'amount', 10),
+    ('savingsgoal', 'target_amount', 12),
+    ('savingsgoal', 'saved_amount', 12),
+    ('budget', 'limit', 10),
+    ('monthlysummary', 'total', 14),
+]
+
+
+def _rescale(factor, places):
+    def rescale(apps, schema_editor):
+        for model_name, field, _ in MONEY_COLUMNS:
+            model = apps.get_model('core', model_name)
+            model.objects.using(schema_editor.connection.alias).update(**{field: Round(F(field) * factor, places)})
+    return rescale
+
+
+# Between the two AlterFields each column is a decimal wide enough to hold
+# the amount in paise, so the scaling runs in SQL on either backend.
+to_paise = _rescale(100, 0)
+to_rupees = _rescale(Decimal('0.01'), 2)
+
+
+def _widen(model_name, field, max_digits):
+    kwargs = {'default': 0} if field in ('saved_amount', 'total') else {}
+    return migrations.AlterField(
+        model_name=model_name, name=field,
+        field=models.DecimalField(decimal_places=2, max_digits=max_digits + 2, **kwargs),
+    )
+
+
+def _to_money(model_name, field, max_digits):
+    kwargs = {'default': 0} if field in ('saved_amount', 'total') else {}
+    return migrations.AlterField(
+        model_name=model_name, name=field,
+        field=core.fields.MoneyField(max_digits=max_digits, **kwargs),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_purge_job'),
+    ]
+
+    operations = [
+        *(_widen(*column) for column in MONEY_COLUMNS),
+        migrations.RunPython(to_paise, to_rupees),
+        *(_to_money(*column) for column in MONEY_COLUMNS),
+    ]
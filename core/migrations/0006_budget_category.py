@@ -0,0 +1,58 @@
+# Generated by Django 5.0 on 2026-10-18 18:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+import core.fields
+
+
+def normalise_budgets(apps, schema_editor):
+    # Budgets were saved with today's date as the month and could be
+    # duplicated by concurrent posts: move each to the first of its month and
+    # keep only the newest per (user, month) before the constraint goes on.
+    Budget = apps.get_model('core', 'Budget')
+    MonthlySummary = apps.get_model('core', 'MonthlySummary')
+    budgets = Budget.objects.using(schema_editor.connection.alias)
+    for budget in budgets.exclude(month__day=1).iterator():
+        budgets.filter(pk=budget.pk).update(month=budget.month.replace(day=1))
+    keep = budgets.values('user_id', 'month').annotate(newest=Max('id')).values('newest')
+    budgets.exclude(id__in=Subquery(keep)).delete()
+
+    spend = (
+        MonthlySummary.objects.filter(user=OuterRef('user'), month=OuterRef('month'), is_income=False)
+        .order_by()
+        .values('user')
+        .annotate(total=Sum('total'))
+        .values('total')
+    )
+    budgets.update(
+        spent=Coalesce(Subquery(spend), Value(0, output_field=core.fields.MoneyField()))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_money_paise'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='category',
+            field=models.CharField(blank=True, choices=[('food', 'Food'), ('transport', 'Transport'), ('bills', 'Bills'), ('entertainment', 'Entertainment'), ('savings', 'Savings'), ('other', 'Other')], default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='spent',
+            field=core.fields.MoneyField(default=0, max_digits=14),
+        ),
+        migrations.RunPython(normalise_budgets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='budget',
+            constraint=models.UniqueConstraint(fields=('user', 'month', 'category'), name='unique_budget_month_category'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from core import search
+    search.install(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from core import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    # Full-text index over Transaction.note: an FTS5 table plus sync triggers
+    # on SQLite, a generated tsvector column with a GIN index on PostgreSQL.
+
+    dependencies = [
+        ('core', '0007_recurring_transaction'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
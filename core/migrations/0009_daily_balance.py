@@ -0,0 +1,61 @@
+# Generated by Django 5.0 on 2026-10-18 19:10
+
+import core.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+from core.money import Money
+
+
+def backfill(apps, schema_editor):
+    # One ledger row per user and day with a non-zero net, running balances
+    # accumulated in date order.
+    Transaction = apps.get_model('core', 'Transaction')
+    DailyBalance = apps.get_model('core', 'DailyBalance')
+    db = schema_editor.connection.alias
+    rows = (
+        Transaction.objects.using(db).values('user_id', 'date', 'is_income')
+        .annotate(total=Sum('amount'))
+        .order_by('user_id', 'date')
+    )
+    net = {}
+    for row in rows:
+        paise = row['total'].paise
+        key = (row['user_id'], row['date'])
+        net[key] = net.get(key, 0) + (paise if row['is_income'] else -paise)
+    ledger, user_id, balance = [], None, 0
+    for (owner, day), paise in sorted(net.items()):
+        if owner != user_id:
+            user_id, balance = owner, 0
+        if paise:
+            balance += paise
+            ledger.append(DailyBalance(user_id=owner, date=day, net=Money(paise), balance=Money(balance)))
+    DailyBalance.objects.using(db).bulk_create(ledger, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_transaction_note_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('net', core.fields.MoneyField(default=0, max_digits=14)),
+                ('balance', core.fields.MoneyField(default=0, max_digits=16)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailybalance',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_daily_balance'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
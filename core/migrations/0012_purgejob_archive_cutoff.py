@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_archived_transaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purgejob',
+            name='archive_cutoff_id',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.validators import MinValueValidator
+
+from .fields import MoneyField
 
 class Category(models.TextChoices):
    FOOD = 'food', 'Food'
@@ -9,35 +12,190 @@ class Category(models.TextChoices):
    SAVINGS = 'savings', 'Savings'
    OTHER = 'other', 'Other'
 
+# User foreign keys on the money tables carry no database constraint: with
+# sharding (core.sharding) these rows live on a different database from
+# auth_user. Deleting a user still cascades through Django's collector and,
+# across shards, core.signals.
 # Renamed Entry to Transaction as per usage elsewhere
 class Transaction(models.Model):
-   user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='entries')
-   amount = models.DecimalField(max_digits=10, decimal_places=2)
+   user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='entries', db_constraint=False)
+   amount = MoneyField(max_digits=10)
    is_income = models.BooleanField(default=False) # True = income, False = expense
    category = models.CharField(max_length=32, choices=Category.choices, default=Category.OTHER)
    note = models.CharField(max_length=255, blank=True)
    created_at = models.DateTimeField(auto_now_add=True)
    date = models.DateField() # date transaction occurred
+   # Set when materialized from a recurring rule; the (recurring, date) unique
+   # constraint below doubles as its index.
+   recurring = models.ForeignKey('RecurringTransaction', null=True, blank=True, on_delete=models.SET_NULL,
+                                 related_name='transactions', db_index=False)
+
+   class Meta:
+      constraints = [
+         # One occurrence per rule and date, so re-running the scheduler can't duplicate.
+         models.UniqueConstraint(fields=['recurring', 'date'], condition=models.Q(recurring__isnull=False),
+                                 name='unique_recurring_occurrence'),
+      ]
+      indexes = [
+         # Date-range sums by kind (month-to-date spend, chart and ledger flows):
+         # seek on (user, date), then is_income and amount come from the index,
+         # so the sums never touch the table. is_income goes after date because
+         # SQLite compiles is_income=True to a bare "is_income" test, which it
+         # can't seek on, and would stop using the columns after it.
+         models.Index(fields=['user', 'date', 'is_income', 'amount'], name='txn_user_date_kind_amt_idx'),
+         # Recent-transaction lists and date-range scans: ordered by (-date, -created_at).
+         models.Index(fields=['user', '-date', '-created_at'], name='txn_user_recent_idx'),
+      ]
    
    def __str__(self): 
       t = "Income" if self.is_income else "Expense"
       return f"{t} {self.amount} - {self.category}"
 
 class SavingsGoal(models.Model):
-   user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='goals')
+   user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='goals', db_constraint=False)
    name = models.CharField(max_length=100)
-   target_amount = models.DecimalField(max_digits=12, decimal_places=2)
-   saved_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+   target_amount = MoneyField(max_digits=12)
+   saved_amount = MoneyField(max_digits=12, default=0)
    deadline = models.DateField(null=True, blank=True)
 
    def __str__(self):
         return f"{self.name} ({self.saved_amount}/{self.target_amount})"
 
 class Budget(models.Model):
-    # Budget was registered in admin but not defined in models. Creating a placeholder.
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
-    limit = models.DecimalField(max_digits=10, decimal_places=2)
-    month = models.DateField() 
-    
+    # One limit per user, month and category; a blank category is the overall
+    # budget for the month. `spent` is kept in step by core.rollups.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets', db_constraint=False)
+    limit = MoneyField(max_digits=10)
+    month = models.DateField()  # first day of the month
+    category = models.CharField(max_length=32, choices=Category.choices, blank=True, default='')
+    spent = MoneyField(max_digits=14, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'category'],
+                name='unique_budget_month_category',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Budget for {self.month}" + (f" ({self.get_category_display()})" if self.category else "")
+
+class MonthlySummary(models.Model):
+    # Per-user rollup of Transaction rows, one row per (month, category, is_income).
+    # Kept in step by core.rollups; rebuild with `manage.py rebuild_monthly_summaries`.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_summaries', db_constraint=False)
+    month = models.DateField()  # first day of the month
+    category = models.CharField(max_length=32, choices=Category.choices, default=Category.OTHER)
+    is_income = models.BooleanField(default=False)
+    total = MoneyField(max_digits=14, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'category', 'is_income'],
+                name='unique_monthly_summary',
+            ),
+        ]
+
+    def __str__(self):
+        t = "Income" if self.is_income else "Expense"
+        return f"{t} {self.category} {self.month:%Y-%m}: {self.total} ({self.count})"
+
+class DailyBalance(models.Model):
+    # Per-user ledger: one row per day with transactions, holding that day's
+    # net change and the running balance at its end. Kept in step by
+    # core.ledger; balance on any date is the latest row on or before it.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_balances', db_constraint=False)
+    date = models.DateField()
+    net = MoneyField(max_digits=14, default=0)
+    balance = MoneyField(max_digits=16, default=0)
+
+    class Meta:
+        constraints = [
+            # Also the (user, date) index behind balance lookups and range scans.
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_daily_balance'),
+        ]
+
+    def __str__(self):
+        return f"Balance {self.date}: {self.balance} ({self.net:+})"
+
+class PurgeJob(models.Model):
+    # A pending "clear all data" request, worked off in keyset-ordered chunks by core.purge.
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='purge_jobs', db_constraint=False)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    cutoff_id = models.BigIntegerField()  # delete transactions with id <= cutoff_id
+    # Archive blocks with id <= archive_cutoff_id go whole. Rows inside older
+    # blocks can carry ids from another shard (core.rebalance keeps them), so
+    # they are never compared with cutoff_id.
+    archive_cutoff_id = models.BigIntegerField(default=0)
+    last_id = models.BigIntegerField(default=0)  # keyset position of the last deleted chunk
+    deleted = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'updated_at'], name='purgejob_status_idx')]
+
+    def __str__(self):
+        return f"Purge for {self.user} ({self.status}, {self.deleted} deleted)"
+
+class RecurringTransaction(models.Model):
+    # A repeating income or expense; `manage.py run_recurring` (see
+    # core.recurring) turns each due occurrence into a Transaction.
+    class Frequency(models.TextChoices):
+        DAILY = 'daily', 'Daily'
+        WEEKLY = 'weekly', 'Weekly'
+        MONTHLY = 'monthly', 'Monthly'
+        YEARLY = 'yearly', 'Yearly'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring', db_constraint=False)
+    amount = MoneyField(max_digits=10)
+    is_income = models.BooleanField(default=False)
+    category = models.CharField(max_length=32, choices=Category.choices, default=Category.OTHER)
+    note = models.CharField(max_length=255, blank=True)
+    frequency = models.CharField(max_length=16, choices=Frequency.choices, default=Frequency.MONTHLY)
+    interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])  # every `interval` periods
+    start_date = models.DateField()  # first occurrence; also the day-of-month anchor
+    end_date = models.DateField(null=True, blank=True)
+    next_run = models.DateField(null=True, blank=True)  # next occurrence to create; null once finished
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['next_run', 'id'], name='recurring_next_run_idx')]
+
+    def save(self, *args, **kwargs):
+        if self.next_run is None and self.pk is None:
+            self.next_run = self.start_date
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        t = "Income" if self.is_income else "Expense"
+        return f"{t} {self.amount} {self.get_frequency_display().lower()} - {self.category}"
+
+class ArchivedTransaction(models.Model):
+    # One immutable block of a user's transactions from a closed month, moved
+    # out of Transaction by `manage.py archive_transactions` (see core.archive).
+    # `data` holds the rows column by column, zlib-compressed; a month can
+    # gain more blocks later but existing ones are never rewritten. The rows
+    # still count in MonthlySummary, Budget.spent and the daily ledger.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_blocks', db_constraint=False)
+    month = models.DateField()  # first day of the month
+    count = models.PositiveIntegerField()
+    first_id = models.BigIntegerField()  # id range of the transactions inside, for purges
+    last_id = models.BigIntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'month'], name='archive_user_month_idx')]
+
     def __str__(self):
-        return f"Budget for {self.month}"
+        return f"Archive {self.month:%Y-%m} ({self.count} transactions)"
@@ -0,0 +1,115 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import total_ordering
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+CENT = Decimal('0.01')
+
+
+@total_ordering
+class Money:
+    """
+    An immutable rupee amount held as integer paise, so sums and differences
+    are plain int arithmetic. Plain numbers and strings on the other side of an
+    operator are read as rupees: Money(150) == Decimal('1.50').
+    """
+    __slots__ = ('paise',)
+
+    def __init__(self, paise=0):
+        object.__setattr__(self, 'paise', int(paise))
+
+    @classmethod
+    def from_rupees(cls, value):
+        if isinstance(value, float):
+            value = repr(value)
+        rupees = value if isinstance(value, Decimal) else Decimal(str(value).strip())
+        if not rupees.is_finite():
+            raise InvalidOperation(f"invalid amount {value!r}")
+        return cls(rupees.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+    @classmethod
+    def coerce(cls, value):
+        return value if isinstance(value, cls) else cls.from_rupees(value)
+
+    @property
+    def rupees(self):
+        return Decimal(self.paise).scaleb(-2)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Money is immutable")
+
+    def __reduce__(self):
+        return (Money, (self.paise,))
+
+    def __str__(self):
+        sign = '-' if self.paise < 0 else ''
+        whole, paise = divmod(abs(self.paise), 100)
+        return f'{sign}{whole}.{paise:02d}'
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __format__(self, spec):
+        return format(self.rupees, spec) if spec else str(self)
+
+    def __hash__(self):
+        return hash(self.rupees)
+
+    def __bool__(self):
+        return self.paise != 0
+
+    def __float__(self):
+        return self.paise / 100
+
+    def _other(self, other):
+        if isinstance(other, Money):
+            return other.paise
+        if isinstance(other, (int, Decimal)) and not isinstance(other, bool):
+            return Money.from_rupees(other).paise
+        return None
+
+    def __eq__(self, other):
+        paise = self._other(other)
+        return NotImplemented if paise is None else self.paise == paise
+
+    def __lt__(self, other):
+        paise = self._other(other)
+        return NotImplemented if paise is None else self.paise < paise
+
+    def __add__(self, other):
+        paise = self._other(other)
+        return NotImplemented if paise is None else Money(self.paise + paise)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        paise = self._other(other)
+        return NotImplemented if paise is None else Money(self.paise - paise)
+
+    def __rsub__(self, other):
+        paise = self._other(other)
+        return NotImplemented if paise is None else Money(paise - self.paise)
+
+    def __mul__(self, other):
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Money(self.paise * other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.paise)
+
+    def __abs__(self):
+        return Money(abs(self.paise))
+
+
+ZERO = Money(0)
+
+
+class MoneyJSONEncoder(DjangoJSONEncoder):
+    # Money goes out as a decimal string, the same as DjangoJSONEncoder does for Decimal.
+    def default(self, o):
+        if isinstance(o, Money):
+            return str(o)
+        return super().default(o)
@@ -0,0 +1,125 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a fixed, unique ordering. The cursor holds
+    the ordering values of the last row on the page, and the next page is a
+    WHERE on those values rather than an OFFSET, so every page costs the same
+    index range scan however deep the client has paged.
+    """
+    ordering = ('-id',)  # must end in a unique field
+    cursor_query_param = 'cursor'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        self.cursor = self.decode_cursor(queryset.model, encoded) if encoded else None
+        if self.cursor:
+            queryset = queryset.filter(self._after(self.cursor))
+
+        # Fetch one extra row to learn whether another page exists.
+        rows = self.fetch(queryset, self.page_size + 1, view)
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def fetch(self, queryset, limit, view=None):
+        return list(queryset[:limit])
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _after(self, values):
+        # (a, b, c) past (x, y, z) == a>x OR (a=x AND b>y) OR (a=x AND b=y AND c>z),
+        # with > flipped to < for descending fields.
+        clauses = []
+        fields = self._fields()
+        for i, (name, descending) in enumerate(fields):
+            lookup = f"{name}__{'lt' if descending else 'gt'}"
+            equal = {prev: values[j] for j, (prev, _) in enumerate(fields[:i])}
+            clauses.append(Q(**equal, **{lookup: values[i]}))
+        # The redundant bound on the leading field gives the planner an index range.
+        first, descending = fields[0]
+        bound = Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]})
+        return bound & reduce(lambda a, b: a | b, clauses)
+
+    def encode_cursor(self, row):
+        # isoformat() keeps full microseconds, which DjangoJSONEncoder would round away.
+        values = [getattr(row, name) for name, _ in self._fields()]
+        values = [v.isoformat() if hasattr(v, 'isoformat') else v for v in values]
+        raw = json.dumps(values, separators=(',', ':'))
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, model, encoded):
+        try:
+            raw = urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            values = json.loads(raw)
+            fields = self._fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [model._meta.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class TransactionPagination(KeysetPagination):
+    ordering = ('-date', '-created_at', '-id')
+
+    def fetch(self, queryset, limit, view=None):
+        # Archived rows (core.archive) are merged in, so paging runs straight
+        # from the hot table into the archive.
+        rows = super().fetch(queryset, limit, view)
+        if view is None or not hasattr(view, 'archived_page'):
+            return rows
+        # A full page of hot rows can only be displaced by archived rows from
+        # its last day on, which skips the archive for most pages.
+        floor = rows[-1].date if len(rows) == limit else None
+        rows += view.archived_page(limit, self.cursor, floor)
+        rows.sort(key=lambda row: (row.date, row.created_at, row.pk), reverse=True)
+        return rows[:limit]
+
+
+class BudgetPagination(KeysetPagination):
+    ordering = ('-month', '-id')
@@ -0,0 +1,113 @@
+from datetime import date
+
+import numpy as np
+from django.utils import timezone
+
+from .models import MonthlySummary, SavingsGoal
+from .money import ZERO, Money
+
+CASH_FLOW_MONTHS = 6
+MAX_MONTHS = 1200  # beyond a century a projection says nothing useful
+NO_DEADLINE = np.iinfo(np.int64).max
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def _month_start(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def monthly_net(user, today, months=CASH_FLOW_MONTHS):
+    """
+    Net cash flow (income minus expense, in paise) for each of the `months`
+    complete months before the current one, read from the MonthlySummary
+    rollup in one query. Months before the user's first recorded activity in
+    the window are dropped so a new account isn't averaged down by zeros.
+    """
+    current = _month_index(today)
+    first = current - months
+    rows = list(
+        MonthlySummary.objects.filter(
+            user=user, month__gte=_month_start(first), month__lt=_month_start(current),
+        ).values_list('month', 'is_income', 'total')
+    )
+    index = np.fromiter((_month_index(month) - first for month, _, _ in rows), np.int64, len(rows))
+    signed = np.fromiter(
+        (total.paise if is_income else -total.paise for _, is_income, total in rows), np.int64, len(rows)
+    )
+    net = np.zeros(months, dtype=np.int64)
+    np.add.at(net, index, signed)
+    active = np.zeros(months, dtype=bool)
+    active[index] = True
+    start = int(active.argmax()) if active.any() else months
+    return first + start, net[start:]
+
+
+def project(goals, rate, today):
+    """
+    Completion and contribution figures for `goals`, all at once. Goals are
+    funded one after another from the monthly `rate` (paise), earliest
+    deadline first and open-ended goals last, so each projection allows for
+    the goals queued ahead of it. The required monthly contribution is what
+    the goal alone needs to be met by its deadline month.
+    """
+    n = len(goals)
+    current = _month_index(today)
+    ids = np.fromiter((goal.pk for goal in goals), np.int64, n)
+    target = np.fromiter((goal.target_amount.paise for goal in goals), np.int64, n)
+    saved = np.fromiter((goal.saved_amount.paise for goal in goals), np.int64, n)
+    deadline = np.fromiter(
+        (_month_index(goal.deadline) if goal.deadline else NO_DEADLINE for goal in goals), np.int64, n
+    )
+    remaining = np.maximum(target - saved, 0)
+    order = np.lexsort((ids, deadline))
+
+    # Months of contributions until each goal is met, in funding order.
+    queued = np.cumsum(remaining[order])
+    months = np.full(n, -1, dtype=np.int64)
+    if rate > 0:
+        months[order] = -(-queued // rate)  # ceiling division
+    months[remaining == 0] = 0
+    months[months > MAX_MONTHS] = -1
+
+    has_deadline = deadline != NO_DEADLINE
+    # Contributions still possible before the deadline, counting this month.
+    months_left = np.where(has_deadline, deadline - current + 1, 0)
+    required = -(-remaining // np.maximum(months_left, 1))
+    progress = np.where(target > 0, np.minimum(saved * 100 // np.maximum(target, 1), 100), 100)
+
+    results = []
+    for i in order:
+        projected = int(months[i])
+        results.append({
+            'id': int(ids[i]),
+            'name': goals[i].name,
+            'target_amount': goals[i].target_amount,
+            'saved_amount': goals[i].saved_amount,
+            'remaining': Money(remaining[i]),
+            'progress': int(progress[i]),
+            'deadline': goals[i].deadline,
+            'months_to_go': projected if projected >= 0 else None,
+            'projected_date': _month_start(current + projected) if projected > 0 else None,
+            'required_monthly': Money(required[i]) if has_deadline[i] else None,
+            'overdue': bool(has_deadline[i] and months_left[i] <= 0 and remaining[i] > 0),
+            'on_track': bool(0 <= projected <= months_left[i]) if has_deadline[i] else None,
+        })
+    return results
+
+
+def build_projections(user, today=None):
+    """Goal projections plus the cash-flow series behind them; two queries."""
+    today = today or timezone.localdate()
+    first, net = monthly_net(user, today)
+    rate = int(net.sum() // len(net)) if len(net) else 0
+    goals = project(list(SavingsGoal.objects.filter(user=user)), rate, today)
+    return {
+        'monthly_net': Money(rate),
+        'cash_flow_months': len(net),
+        'cash_flow': [{'month': _month_start(first + i), 'net': Money(value)} for i, value in enumerate(net)],
+        'goals': goals,
+        'required_monthly_total': sum((goal['required_monthly'] or ZERO for goal in goals), ZERO),
+    }
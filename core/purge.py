@@ -0,0 +1,160 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import archive, rollups, sharding
+from .models import ArchivedTransaction, PurgeJob, Transaction
+
+# A running job that hasn't recorded progress for this long is assumed dead
+# (e.g. its worker thread went away with the process) and can be resumed.
+STALE_AFTER = timedelta(minutes=5)
+
+
+def chunk_size():
+    return getattr(settings, 'TRANSACTION_PURGE_CHUNK_SIZE', 1000)
+
+
+def start_purge(user):
+    """
+    Record a purge of every transaction `user` has right now and, unless
+    TRANSACTION_PURGE_IN_THREAD is off, start working it off in a background
+    thread once the surrounding transaction commits. Rows added afterwards are
+    left alone. An unfinished job for the same user is extended rather than
+    duplicated.
+    """
+    cutoff = Transaction.objects.filter(user=user).aggregate(m=Max('id'))['m']
+    archive_cutoff = ArchivedTransaction.objects.filter(user=user).aggregate(m=Max('id'))['m']
+    if cutoff is None and archive_cutoff is None:
+        return None
+    cutoff, archive_cutoff = cutoff or 0, archive_cutoff or 0
+    with sharding.atomic():
+        job = (
+            PurgeJob.objects.select_for_update()
+            .filter(user=user)
+            .exclude(status=PurgeJob.Status.DONE)
+            .first()
+        )
+        if job:
+            job.cutoff_id = max(job.cutoff_id, cutoff)
+            job.archive_cutoff_id = max(job.archive_cutoff_id, archive_cutoff)
+            job.save(update_fields=['cutoff_id', 'archive_cutoff_id', 'updated_at'])
+        else:
+            job = PurgeJob.objects.create(user=user, cutoff_id=cutoff, archive_cutoff_id=archive_cutoff)
+    if getattr(settings, 'TRANSACTION_PURGE_IN_THREAD', True):
+        transaction.on_commit(lambda: _spawn(job.pk, user.pk), using=sharding.db())
+    return job
+
+
+def _spawn(job_id, user_id):
+    threading.Thread(target=_run_in_thread, args=(job_id, user_id), daemon=True).start()
+
+
+def _run_in_thread(job_id, user_id):
+    try:
+        with sharding.for_user(user_id):
+            run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def _claim(job_id):
+    # Compare-and-set so a thread and the management command never work one job together.
+    stale = timezone.now() - STALE_AFTER
+    claimable = Q(status=PurgeJob.Status.PENDING) | Q(status=PurgeJob.Status.RUNNING, updated_at__lt=stale)
+    return PurgeJob.objects.filter(claimable, pk=job_id).update(
+        status=PurgeJob.Status.RUNNING, updated_at=timezone.now()
+    )
+
+
+def delete_chunk(job, size):
+    """
+    Delete the next `size` transactions of `job` in key order and fold them out
+    of the monthly rollup, all in one short transaction. The delete is a raw
+    DELETE by id range: Transaction has no dependent rows, so Django's
+    per-object collector has nothing to do. Once no hot rows are left, the
+    next archived block goes instead. Returns the number deleted.
+    """
+    with sharding.atomic():
+        job.refresh_from_db(fields=['cutoff_id', 'archive_cutoff_id'])  # start_purge may have extended them
+        rows = list(
+            Transaction.objects.filter(user_id=job.user_id, id__gt=job.last_id, id__lte=job.cutoff_id)
+            .order_by('id')
+            .values_list('id', 'user_id', 'date', 'category', 'is_income', 'amount')[:size]
+        )
+        if not rows:
+            return _delete_archived(job)
+        upper = rows[-1][0]
+        doomed = Transaction.objects.filter(user_id=job.user_id, id__gt=job.last_id, id__lte=upper)
+        deleted = doomed._raw_delete(doomed.db)
+        rollups.apply_rows((row[1:] for row in rows), sign=-1)
+        job.last_id = upper
+        job.deleted += deleted
+        job.save(update_fields=['last_id', 'deleted', 'updated_at'])
+    return deleted
+
+
+def _delete_archived(job):
+    # With the hot rows gone, archived blocks go one per chunk: every block
+    # that existed when the purge was requested, whole, then any block
+    # archived since from hot rows up to cutoff_id (rebalancing waits for
+    # the job, so those ids share the hot table's sequence). A later block
+    # that also holds newer rows is replaced by one without the purged rows.
+    block = (
+        ArchivedTransaction.objects.filter(
+            Q(id__lte=job.archive_cutoff_id) | Q(first_id__lte=job.cutoff_id), user_id=job.user_id,
+        )
+        .order_by('id').first()
+    )
+    if block is None:
+        return 0
+    rows = archive.decode(block)
+    whole = block.pk <= job.archive_cutoff_id
+    doomed = [row for row in rows if whole or row[0] <= job.cutoff_id]
+    block.delete()
+    archive.append(job.user_id, block.month, [] if whole else [row for row in rows if row[0] > job.cutoff_id])
+    rollups.apply_rows(
+        [(job.user_id, day, category, is_income, amount) for _, day, _, amount, is_income, category, _, _ in doomed],
+        sign=-1,
+    )
+    job.deleted += len(doomed)
+    job.save(update_fields=['deleted', 'updated_at'])
+    return len(doomed)
+
+
+def run_job(job_id, size=None, pause=0.0):
+    """Claim and finish one job. Returns the job, or None if someone else holds it."""
+    if not _claim(job_id):
+        return None
+    job = PurgeJob.objects.get(pk=job_id)
+    size = size or chunk_size()
+    while True:
+        while delete_chunk(job, size):
+            if pause:
+                time.sleep(pause)  # let other writers at the database between chunks
+        with sharding.atomic():
+            rollups.prune_empty(job.user_id)
+            now = timezone.now()
+            # Only finish if the cutoffs we worked to are still the job's.
+            finished = PurgeJob.objects.filter(
+                pk=job.pk, cutoff_id=job.cutoff_id, archive_cutoff_id=job.archive_cutoff_id,
+            ).update(status=PurgeJob.Status.DONE, finished_at=now, updated_at=now)
+        if finished:
+            job.refresh_from_db()
+            return job
+
+
+def run_pending(size=None, pause=0.0):
+    """Finish every pending or stalled job on every shard; returns the jobs completed."""
+    stale = timezone.now() - STALE_AFTER
+    done = []
+    for _ in sharding.each_shard():
+        ids = PurgeJob.objects.filter(
+            Q(status=PurgeJob.Status.PENDING) | Q(status=PurgeJob.Status.RUNNING, updated_at__lt=stale)
+        ).order_by('id').values_list('id', flat=True)
+        done.extend(job for job in (run_job(job_id, size, pause) for job_id in list(ids)) if job)
+    return done
@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from . import archive, rollups, sharding
+from .models import ArchivedTransaction, Budget, PurgeJob, RecurringTransaction, SavingsGoal, Transaction
+
+BATCH_SIZE = 1000
+
+
+def misplaced(alias):
+    """Ids of users with rows on `alias` who now hash to a different shard."""
+    user_ids = set()
+    for model in sharding.sharded_models():
+        user_ids.update(model._base_manager.using(alias).order_by().values_list('user_id', flat=True).distinct())
+    return sorted(user_id for user_id in user_ids if sharding.shard_for(user_id) != alias)
+
+
+def sources():
+    # Everywhere money rows may live: the shards, plus `default` from before sharding.
+    return [alias for alias in settings.DATABASES if alias == 'default' or alias in sharding.shards()]
+
+
+@contextmanager
+def _keep_timestamps():
+    # bulk_create would stamp copied rows with the current time.
+    fields = [field for model in sharding.sharded_models() for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _copy(rows, target, batch_size, **options):
+    batch = []
+    for row in rows:
+        row.pk = None
+        batch.append(row)
+        if len(batch) >= batch_size:
+            row.__class__.objects.using(target).bulk_create(batch, **options)
+            batch.clear()
+    if batch:
+        batch[0].__class__.objects.using(target).bulk_create(batch, **options)
+
+
+def _remap(txns, rule_ids):
+    for txn in txns:
+        txn.recurring_id = rule_ids.get(txn.recurring_id)
+        yield txn
+
+
+def _remap_blocks(blocks, rule_ids):
+    for block in blocks:
+        rows = archive.decode(block)
+        if any(row[-1] for row in rows):
+            block.data = archive.encode([(*row[:-1], rule_ids.get(row[-1])) for row in rows])
+        yield block
+
+
+def move_user(user_id, source, target, batch_size=BATCH_SIZE):
+    """
+    Copy one user's rows from `source` to `target`, rebuild their rollups
+    there and delete them from `source`. Rows get new ids on the target, so
+    API clients holding old ids or page cursors must refetch. Rows the user
+    already has on the target (written after the shard list changed) are
+    kept; a budget for the same month and category keeps the target's. The
+    target commits before the source does, so an interrupted move leaves
+    rows on both shards rather than on neither. Users with an unfinished
+    purge are skipped. Returns the number of transactions moved, or None if
+    skipped.
+    """
+    if PurgeJob.objects.using(source).filter(user_id=user_id).exclude(status=PurgeJob.Status.DONE).exists():
+        return None
+    with transaction.atomic(using=source), transaction.atomic(using=target), _keep_timestamps():
+        rules = list(RecurringTransaction.objects.using(source).filter(user_id=user_id).order_by('id'))
+        old_ids = [rule.pk for rule in rules]
+        _copy(rules, target, batch_size)
+        new_ids = dict(zip(old_ids, (rule.pk for rule in rules)))
+
+        txns = Transaction.objects.using(source).filter(user_id=user_id)
+        moved = txns.count()
+        _copy(_remap(txns.order_by('id').iterator(chunk_size=batch_size), new_ids), target, batch_size)
+        _copy(Budget.objects.using(source).filter(user_id=user_id), target, batch_size, ignore_conflicts=True)
+        _copy(SavingsGoal.objects.using(source).filter(user_id=user_id), target, batch_size)
+        # Archived transactions keep their original ids inside the blocks.
+        blocks = ArchivedTransaction.objects.using(source).filter(user_id=user_id).order_by('id')
+        _copy(_remap_blocks(blocks.iterator(chunk_size=100), new_ids), target, batch_size)
+
+        for model in sharding.sharded_models():
+            model._base_manager.using(source).filter(user_id=user_id).delete()
+        with sharding.on_shard(target):
+            rollups.rebuild([user_id], batch_size)
+    return moved
@@ -0,0 +1,112 @@
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError
+from django.utils import timezone
+
+from . import rollups, sharding
+from .models import RecurringTransaction, Transaction
+
+Frequency = RecurringTransaction.Frequency
+BATCH_SIZE = 1000
+MAX_RETRIES = 3
+
+
+def _add_months(day, months, anchor):
+    # Month arithmetic that clamps to the month's length but keeps returning
+    # to the anchor day: Jan 31 -> Feb 28 -> Mar 31.
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    month += 1
+    return day.replace(year=year, month=month, day=min(anchor, calendar.monthrange(year, month)[1]))
+
+
+def advance(rule, day):
+    step = max(rule.interval, 1)
+    if rule.frequency == Frequency.DAILY:
+        return day + timedelta(days=step)
+    if rule.frequency == Frequency.WEEKLY:
+        return day + timedelta(weeks=step)
+    months = step * 12 if rule.frequency == Frequency.YEARLY else step
+    return _add_months(day, months, rule.start_date.day)
+
+
+def occurrences(rule, today):
+    """
+    Every occurrence of `rule` from its next_run up to `today` (and its
+    end_date), plus the next_run to store afterwards: None once the rule has
+    run past its end_date.
+    """
+    last = min(today, rule.end_date) if rule.end_date else today
+    dates, day = [], rule.next_run
+    while day is not None and day <= last:
+        dates.append(day)
+        day = advance(rule, day)
+    if day is not None and rule.end_date and day > rule.end_date:
+        day = None
+    return dates, day
+
+
+def _materialize(rules, today, batch_size):
+    rows = []
+    advanced = defaultdict(list)  # new next_run -> rule ids
+    for rule in rules:
+        dates, rule.next_run = occurrences(rule, today)
+        advanced[rule.next_run].append(rule.pk)
+        rows.extend(
+            Transaction(user_id=rule.user_id, amount=rule.amount, is_income=rule.is_income,
+                        category=rule.category, note=rule.note, date=day, recurring=rule)
+            for day in dates
+        )
+    Transaction.objects.bulk_create(rows, batch_size=batch_size)
+    # Rules due together mostly advance to the same few dates, so one UPDATE
+    # per distinct date beats a per-row CASE from bulk_update.
+    for next_run, ids in advanced.items():
+        RecurringTransaction.objects.filter(pk__in=ids).update(next_run=next_run)
+    rollups.apply_batch(
+        ((txn.user_id, txn.date, txn.category, txn.is_income, txn.amount) for txn in rows), batch_size=batch_size
+    )
+    return rows
+
+
+def run_due(today=None, batch_size=BATCH_SIZE):
+    """
+    Materialize every occurrence due on or before `today` for all users,
+    catching up on any periods missed since the last run. Due rules are read
+    in batches off the (next_run, id) index; each batch's transactions,
+    next_run updates and rollup changes commit together, so a crashed run
+    simply resumes. On PostgreSQL concurrent runs skip each other's locked
+    rules; elsewhere the unique (recurring, date) constraint turns a double
+    insert into a retry of the batch, which then sees the advanced next_run.
+    Shards are worked one after another. Returns (rules processed,
+    transactions created).
+    """
+    today = today or timezone.localdate()
+    processed = created = 0
+    for _ in sharding.each_shard():
+        shard_processed, shard_created = _run_shard(today, batch_size)
+        processed += shard_processed
+        created += shard_created
+    return processed, created
+
+
+def _run_shard(today, batch_size):
+    processed = created = retries = 0
+    while True:
+        try:
+            with sharding.atomic():
+                rules = list(
+                    RecurringTransaction.objects.select_for_update(skip_locked=True)
+                    .filter(next_run__lte=today)
+                    .order_by('next_run', 'id')[:batch_size]
+                )
+                rows = _materialize(rules, today, batch_size) if rules else []
+        except IntegrityError:
+            retries += 1
+            if retries > MAX_RETRIES:
+                raise
+            continue
+        if not rules:
+            return processed, created
+        processed += len(rules)
+        created += len(rows)
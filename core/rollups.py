@@ -0,0 +1,174 @@
+from collections import defaultdict
+
+from django.db import IntegrityError
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import TruncMonth
+
+from . import archive, budgets, caching, ledger, sharding
+from .bulk import increment_many
+from .fields import MoneyField
+from .models import ArchivedTransaction, Budget, MonthlySummary, Transaction
+from .money import Money
+
+
+def _bump(user_id, month, category, is_income, paise, count):
+    lookup = {'user_id': user_id, 'month': month, 'category': category, 'is_income': is_income}
+    total = Value(Money(paise), output_field=MoneyField())
+    updated = MonthlySummary.objects.filter(**lookup).update(
+        total=F('total') + total, count=F('count') + count
+    )
+    if updated:
+        return
+    try:
+        with sharding.atomic():
+            MonthlySummary.objects.create(total=Money(paise), count=count, **lookup)
+    except IntegrityError:
+        # Another request created the row first; fold our delta into it.
+        MonthlySummary.objects.filter(**lookup).update(
+            total=F('total') + total, count=F('count') + count
+        )
+
+
+def _deltas(rows, sign):
+    deltas = defaultdict(lambda: [0, 0])
+    for user_id, day, category, is_income, amount in rows:
+        delta = deltas[(user_id, day.replace(day=1), category, is_income)]
+        delta[0] += Money.coerce(amount).paise * sign
+        delta[1] += sign
+    return deltas
+
+
+def apply_rows(rows, sign=1):
+    """
+    Fold saved (sign=1) or deleted (sign=-1) rows into the monthly rollup,
+    issuing one upsert per affected summary row, expense deltas into the
+    matching budgets' `spent`, and net changes into the daily ledger. Each
+    row is a (user_id, date, category, is_income, amount) tuple.
+    """
+    rows = list(rows)
+    deltas = _deltas(rows, sign)
+    with sharding.atomic():
+        for (user_id, month, category, is_income), (paise, count) in deltas.items():
+            _bump(user_id, month, category, is_income, paise, count)
+            if not is_income:
+                budgets.add_spend(user_id, month, category, paise)
+        ledger.apply_rows(rows, sign)
+    # Bulk paths (imports, purges) skip model signals, so invalidate here too.
+    for user_id in {key[0] for key in deltas}:
+        caching.invalidate(user_id)
+
+
+def apply_batch(rows, sign=1, batch_size=1000):
+    """
+    Set-based apply_rows for large batches touching many users. Summary rows
+    that don't exist yet are inserted empty (ignoring conflicts with
+    concurrent inserts), then every delta is added with a single executemany
+    UPDATE, so the work is a handful of statements rather than an upsert per
+    key, and concurrent writers still can't lose each other's increments.
+    """
+    rows = list(rows)
+    deltas = _deltas(rows, sign)
+    if not deltas:
+        return
+    existing = set(
+        MonthlySummary.objects.filter(
+            user_id__in={key[0] for key in deltas}, month__in={key[1] for key in deltas}
+        ).values_list('user_id', 'month', 'category', 'is_income')
+    )
+    with sharding.atomic():
+        MonthlySummary.objects.bulk_create(
+            (MonthlySummary(user_id=user_id, month=month, category=category, is_income=is_income)
+             for user_id, month, category, is_income in deltas.keys() - existing),
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        increment_many(
+            MonthlySummary, ['user', 'month', 'category', 'is_income'], ['total', 'count'],
+            ((key, (Money(paise), count)) for key, (paise, count) in deltas.items()),
+        )
+        budgets.add_spend_batch(deltas)
+        ledger.apply_rows(rows, sign)
+    for user_id in {key[0] for key in deltas}:
+        caching.invalidate(user_id)
+
+
+def apply_transactions(transactions, sign=1):
+    apply_rows(
+        ((txn.user_id, txn.date, txn.category, txn.is_income, txn.amount) for txn in transactions),
+        sign,
+    )
+
+
+def apply_transaction(txn, sign=1):
+    apply_transactions([txn], sign)
+
+
+def prune_empty(user):
+    MonthlySummary.objects.filter(user=user, count=0).delete()
+
+
+def expected_rows(queryset=None, archived=None):
+    """
+    Rollup rows recomputed from scratch, keyed like MonthlySummary, counting
+    the `archived` blocks' rows too (every block when neither is given).
+    """
+    if queryset is None:
+        queryset = Transaction.objects.all()
+        archived = ArchivedTransaction.objects.all() if archived is None else archived
+    rows = (
+        queryset.annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category', 'is_income')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    expected = {
+        (r['user_id'], r['month'], r['category'], r['is_income']): (r['total'], r['count'])
+        for r in rows
+    }
+    if archived is not None:
+        for key, (paise, count) in _deltas(archive.flow_rows(archived), 1).items():
+            total, existing = expected.get(key, (Money(0), 0))
+            expected[key] = (Money(total.paise + paise), existing + count)
+    return expected
+
+
+def stored_rows(queryset=None):
+    queryset = MonthlySummary.objects.all() if queryset is None else queryset
+    return {
+        (r.user_id, r.month, r.category, r.is_income): (r.total, r.count)
+        for r in queryset.exclude(count=0)
+    }
+
+
+def find_drift(expected, stored):
+    """Keys whose stored (total, count) differs from the recomputed value."""
+    return sorted(key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key))
+
+
+def rebuild(users=None, batch_size=1000):
+    """
+    Replace the rollup and daily ledger for `users` (or everyone) with
+    freshly computed rows, then recompute their budgets' `spent` from it.
+    """
+    txns = Transaction.objects.all()
+    archived = ArchivedTransaction.objects.all()
+    summaries = MonthlySummary.objects.all()
+    user_budgets = Budget.objects.all()
+    if users is not None:
+        txns = txns.filter(user__in=users)
+        archived = archived.filter(user__in=users)
+        summaries = summaries.filter(user__in=users)
+        user_budgets = user_budgets.filter(user__in=users)
+    rows = [
+        MonthlySummary(user_id=user_id, month=month, category=category, is_income=is_income,
+                       total=total, count=count)
+        for (user_id, month, category, is_income), (total, count) in expected_rows(txns, archived).items()
+    ]
+    with sharding.atomic():
+        affected = {row.user_id for row in rows} | set(summaries.values_list('user_id', flat=True))
+        summaries.delete()
+        MonthlySummary.objects.bulk_create(rows, batch_size=batch_size)
+        budgets.refresh_spent(user_budgets)
+        ledger.rebuild(users, batch_size)
+        for user_id in affected:
+            caching.invalidate(user_id)
+    return len(rows)
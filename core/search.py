@@ -0,0 +1,171 @@
+import re
+
+from django.db import connections, router
+from django.db.utils import OperationalError
+
+from . import archive
+from .models import Transaction
+
+TABLE = Transaction._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+PG_COLUMN = 'note_search'
+MIGRATION = '0008_transaction_note_search'
+MAX_TERMS = 8
+
+# SQLite: an external-content FTS5 table over core_transaction.note, kept in
+# step by triggers so bulk_create, queryset deletes and raw SQL all stay in
+# sync. The prefix indexes make 'rent*'-style queries index lookups.
+SQLITE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    note, content='{TABLE}', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)"""
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+    INSERT INTO {FTS_TABLE}(rowid, note) VALUES (new.id, new.note);
+END""",
+    f'{FTS_TABLE}_ad': f"""
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, note) VALUES ('delete', old.id, old.note);
+END""",
+    f'{FTS_TABLE}_au': f"""
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF note ON {TABLE} BEGIN
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, note) VALUES ('delete', old.id, old.note);
+    INSERT INTO {FTS_TABLE}(rowid, note) VALUES (new.id, new.note);
+END""",
+}
+
+# PostgreSQL: a stored generated tsvector column with a GIN index, which the
+# database maintains on every write.
+POSTGRES_DDL = [
+    f"""ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS {PG_COLUMN} tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', note)) STORED""",
+    f"CREATE INDEX IF NOT EXISTS txn_note_search_idx ON {TABLE} USING gin ({PG_COLUMN})",
+]
+
+
+def install(connection):
+    """
+    Create the note index for `connection`'s backend if it's missing. Safe to
+    repeat: SQLite table rebuilds in later migrations drop the triggers, so
+    this also runs after every migrate and reindexes when it had to put them
+    back. Other backends fall back to LIKE and need nothing.
+    """
+    _fts_tables.pop(connection.alias, None)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for sql in POSTGRES_DDL:
+                cursor.execute(sql)
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(SQLITE_TABLE)
+            except OperationalError:  # SQLite built without FTS5
+                return
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [TABLE]
+            )
+            present = {name for name, in cursor.fetchall()}
+            if present >= SQLITE_TRIGGERS.keys():
+                return
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS txn_note_search_idx')
+            cursor.execute(f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS {PG_COLUMN}')
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    _fts_tables.pop(connection.alias, None)
+
+
+def terms(query):
+    """The words of a free-text query, lowercased; each is matched as a prefix."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+_fts_tables = {}  # database alias -> whether the FTS5 table exists
+
+
+def _has_fts(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+            _fts_tables[connection.alias] = cursor.fetchone() is not None
+    return _fts_tables[connection.alias]
+
+
+def search(user, query, start=None, end=None, min_amount=None, max_amount=None,
+           category=None, is_income=None, limit=50):
+    """
+    The user's transactions whose note contains every word of `query` as a
+    prefix ("elec bill" finds "Electricity bill"), best match first, then
+    newest. Each result carries a `rank` (higher is better). Filters are
+    applied in the same query, so it's one round trip on every backend.
+    Archived transactions (core.archive) match the same way but rank 0, so
+    they follow the indexed matches.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    db = router.db_for_read(Transaction)
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    amount = Transaction._meta.get_field('amount')
+    where, params = ['t.user_id = %s'], [user.pk]
+    if start:
+        where.append('t.date >= %s')
+        params.append(start)
+    if end:
+        where.append('t.date <= %s')
+        params.append(end)
+    if min_amount is not None:
+        where.append('t.amount >= %s')
+        params.append(amount.get_db_prep_value(min_amount, connection))
+    if max_amount is not None:
+        where.append('t.amount <= %s')
+        params.append(amount.get_db_prep_value(max_amount, connection))
+    if category:
+        where.append('t.category = %s')
+        params.append(category)
+    if is_income is not None:
+        where.append('t.is_income = %s')
+        params.append(is_income)
+    columns = ', '.join(f't.{qn(field.column)}' for field in Transaction._meta.concrete_fields)
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT {columns}, ts_rank(t.{PG_COLUMN}, q) AS rank "
+            f"FROM {TABLE} t, to_tsquery('simple', %s) q "
+            f"WHERE t.{PG_COLUMN} @@ q AND {' AND '.join(where)} "
+        )
+        params.insert(0, ' & '.join(f'{word}:*' for word in words))
+    elif _has_fts(connection):
+        # bm25() is lower-is-better; negate it so rank reads the same everywhere.
+        sql = (
+            f"SELECT {columns}, -bm25({FTS_TABLE}) AS rank "
+            f"FROM {FTS_TABLE} JOIN {TABLE} t ON t.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND {' AND '.join(where)} "
+        )
+        params.insert(0, ' '.join(f'"{word}"*' for word in words))
+    else:
+        sql = f"SELECT {columns}, 0 AS rank FROM {TABLE} t WHERE {' AND '.join(where)} "
+        for word in words:
+            sql += 'AND LOWER(t.note) LIKE %s '
+            params.append(f'%{word}%')
+    sql += 'ORDER BY rank DESC, t.date DESC, t.id DESC LIMIT %s'
+    params.append(limit)
+    results = list(Transaction.objects.db_manager(db).raw(sql, params))
+    results += archive.search_rows(user, words, limit, start=start, end=end, min_amount=min_amount,
+                                   max_amount=max_amount, category=category, is_income=is_income)
+    results.sort(key=lambda txn: (txn.rank, txn.date, txn.pk), reverse=True)
+    return results[:limit]
@@ -0,0 +1,118 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from . import rollups, sharding
+from .models import Budget, Category, SavingsGoal, Transaction
+
+# (category, share of expense rows, typical amount range in rupees)
+EXPENSE_PROFILE = [
+    (Category.FOOD, 0.45, (80, 1500)),
+    (Category.TRANSPORT, 0.20, (30, 800)),
+    (Category.ENTERTAINMENT, 0.12, (150, 3000)),
+    (Category.OTHER, 0.13, (50, 5000)),
+    (Category.SAVINGS, 0.05, (1000, 10000)),
+    (Category.BILLS, 0.05, (300, 4000)),
+]
+GOAL_NAMES = ['Emergency fund', 'New laptop', 'Vacation', 'Bike', 'Wedding', 'Car down payment']
+NOTES = {
+    Category.FOOD: ['Groceries', 'Lunch', 'Dinner out', 'Swiggy', 'Chai'],
+    Category.TRANSPORT: ['Metro', 'Auto', 'Fuel', 'Cab'],
+    Category.ENTERTAINMENT: ['Movie', 'Concert', 'Subscription'],
+    Category.OTHER: ['Shopping', 'Gift', 'Pharmacy'],
+    Category.SAVINGS: ['SIP', 'RD deposit'],
+    Category.BILLS: ['Electricity', 'Internet', 'Phone', 'Rent'],
+}
+
+
+def _money(rng, low, high):
+    return Decimal(rng.randrange(low * 100, high * 100)) / 100
+
+
+def _months_back(today, months):
+    first = today.replace(day=1)
+    for _ in range(months):
+        yield first
+        first = (first - timedelta(days=1)).replace(day=1)
+
+
+def user_history(user, transactions, months, rng, today):
+    """
+    Synthetic but plausible history for one user: a salary on the 1st of each
+    month, rent a few days later, and everyday expenses and occasional
+    freelance income spread over the period, `transactions` rows in all.
+    Everyday amounts are scaled so spending lands near the user's income.
+    """
+    month_starts = list(_months_back(today, months))
+    salary = _money(rng, 25_000, 150_000).quantize(Decimal('1'))
+    rows = []
+    for start in month_starts:
+        rows.append(Transaction(user=user, amount=salary, is_income=True, category=Category.OTHER,
+                                note='Salary', date=start))
+        rows.append(Transaction(user=user, amount=(salary * Decimal('0.3')).quantize(Decimal('1')),
+                                category=Category.BILLS, note='Rent', date=start + timedelta(days=4)))
+    span = (today - month_starts[-1]).days + 1
+    categories = [c for c, _, _ in EXPENSE_PROFILE]
+    weights = [w for _, w, _ in EXPENSE_PROFILE]
+    ranges = {c: r for c, _, r in EXPENSE_PROFILE}
+    everyday = max(1, transactions - len(rows))
+    typical = sum(w * (low + high) / 2 for _, w, (low, high) in EXPENSE_PROFILE)
+    scale = Decimal(str(round(float(salary) * 0.65 * months / everyday / typical, 4)))
+    for _ in range(max(0, transactions - len(rows))):
+        category = rng.choices(categories, weights)[0]
+        if rng.random() < 0.03:
+            rows.append(Transaction(user=user, amount=_money(rng, 500, 20_000), is_income=True,
+                                    category=Category.OTHER, note='Freelance',
+                                    date=month_starts[-1] + timedelta(days=rng.randrange(span))))
+            continue
+        amount = max(Decimal('1.00'), (_money(rng, *ranges[category]) * scale).quantize(Decimal('0.01')))
+        rows.append(Transaction(user=user, amount=amount, category=category,
+                                note=rng.choice(NOTES[category]),
+                                date=month_starts[-1] + timedelta(days=rng.randrange(span))))
+    budgets = [Budget(user=user, month=start, limit=(salary * Decimal('0.6')).quantize(Decimal('1')))
+               for start in month_starts]
+    goals = [
+        SavingsGoal(user=user, name=name, target_amount=_money(rng, 10_000, 500_000).quantize(Decimal('1')),
+                    saved_amount=_money(rng, 0, 10_000), deadline=today + timedelta(days=rng.randrange(60, 900)))
+        for name in rng.sample(GOAL_NAMES, rng.randrange(1, 4))
+    ]
+    return rows[:transactions], budgets, goals
+
+
+def seed(users=10, transactions=1000, months=12, prefix='demo', password='demo-pass',
+         random_seed=None, batch_size=5000, today=None):
+    """Create `users` users with generated histories; returns the new users."""
+    rng = random.Random(random_seed)
+    today = today or date.today()
+    hashed = make_password(password)  # hash once; it dominates runtime otherwise
+    start = User.objects.filter(username__startswith=prefix).count()
+    owners = User.objects.bulk_create(
+        User(username=f'{prefix}{start + i}', password=hashed) for i in range(users)
+    )
+    if not all(owner.pk for owner in owners):
+        owners = list(User.objects.filter(username__in=[o.username for o in owners]))
+    by_id = {owner.pk: owner for owner in owners}
+    for alias, ids in sharding.by_shard(by_id).items():
+        with sharding.on_shard(alias):
+            _seed_histories([by_id[pk] for pk in ids], transactions, months, rng, today, batch_size)
+    return owners
+
+
+def _seed_histories(owners, transactions, months, rng, today, batch_size):
+    with sharding.atomic():
+        pending, budgets, goals = [], [], []
+        for owner in owners:
+            rows, owner_budgets, owner_goals = user_history(owner, transactions, months, rng, today)
+            pending.extend(rows)
+            budgets.extend(owner_budgets)
+            goals.extend(owner_goals)
+            if len(pending) >= batch_size:
+                Transaction.objects.bulk_create(pending, batch_size=batch_size)
+                pending.clear()
+        Transaction.objects.bulk_create(pending, batch_size=batch_size)
+        Budget.objects.bulk_create(budgets, batch_size=batch_size)
+        SavingsGoal.objects.bulk_create(goals, batch_size=batch_size)
+        rollups.rebuild(owners)
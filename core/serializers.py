@@ -0,0 +1,143 @@
+from rest_framework import serializers
+
+from .fields import MoneyField
+from .models import Budget, SavingsGoal, Transaction
+from .money import Money
+
+
+class MoneySerializerField(serializers.DecimalField):
+    # Same wire format as the old DecimalFields: a rupee string with two places.
+    def __init__(self, max_digits=None, decimal_places=2, **kwargs):
+        super().__init__(max_digits, decimal_places, **kwargs)
+
+    def to_internal_value(self, data):
+        return Money.from_rupees(super().to_internal_value(data))
+
+
+class MoneyModelSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        MoneyField: MoneySerializerField,
+    }
+
+    def build_standard_field(self, field_name, model_field):
+        field_class, field_kwargs = super().build_standard_field(field_name, model_field)
+        if isinstance(model_field, MoneyField):
+            field_kwargs.pop('min_value', None)
+            field_kwargs.pop('max_value', None)
+            field_kwargs['max_digits'] = model_field.max_digits
+        return field_class, field_kwargs
+
+
+class FieldSelectionMixin:
+    """
+    Lets clients trim payloads with `?fields=a,b`. Unknown names are ignored;
+    `id` is always kept so rows stay addressable.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        wanted = request.query_params.get('fields') if request else None
+        if wanted:
+            keep = {name.strip() for name in wanted.split(',')} | {'id'}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+
+class TransactionSerializer(FieldSelectionMixin, MoneyModelSerializer):
+    class Meta:
+        model = Transaction
+        fields = ['id', 'date', 'amount', 'is_income', 'category', 'note', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate_amount(self, value):
+        # is_income carries the sign; a negative or zero amount would run the
+        # rollups, budgets and ledger backwards (the CSV importer rejects them too).
+        if value.paise <= 0:
+            raise serializers.ValidationError("Must be positive.")
+        return value
+
+
+class SavingsGoalSerializer(FieldSelectionMixin, MoneyModelSerializer):
+    class Meta:
+        model = SavingsGoal
+        fields = ['id', 'name', 'target_amount', 'saved_amount', 'deadline']
+
+
+class BudgetSerializer(FieldSelectionMixin, MoneyModelSerializer):
+    class Meta:
+        model = Budget
+        fields = ['id', 'month', 'category', 'limit', 'spent']
+        read_only_fields = ['spent']
+        # Uniqueness is handled by the upsert in BudgetViewSet.
+        validators = []
+
+    def validate_month(self, value):
+        return value.replace(day=1)
+
+
+class TransactionFilterSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    category = serializers.ChoiceField(choices=Transaction._meta.get_field('category').choices, required=False)
+    is_income = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+
+class TransactionSearchSerializer(TransactionFilterSerializer):
+    q = serializers.CharField(max_length=200)
+    min_amount = MoneySerializerField(max_digits=10, required=False)
+    max_amount = MoneySerializerField(max_digits=10, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=50)
+
+
+class BalanceQuerySerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'end' in attrs and 'start' not in attrs:
+            raise serializers.ValidationError({'start': 'Required with end.'})
+        if 'start' in attrs and attrs['start'] > attrs.get('end', attrs['start']):
+            raise serializers.ValidationError({'end': 'Must not be before start.'})
+        return attrs
+
+
+class BalancePointSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    balance = MoneySerializerField()
+
+
+class TransactionSearchResultSerializer(TransactionSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(TransactionSerializer.Meta):
+        fields = TransactionSerializer.Meta.fields + ['rank']
+
+
+class GoalProjectionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    target_amount = MoneySerializerField()
+    saved_amount = MoneySerializerField()
+    remaining = MoneySerializerField()
+    progress = serializers.IntegerField()
+    deadline = serializers.DateField(allow_null=True)
+    months_to_go = serializers.IntegerField(allow_null=True)
+    projected_date = serializers.DateField(allow_null=True)
+    required_monthly = MoneySerializerField(allow_null=True)
+    overdue = serializers.BooleanField()
+    on_track = serializers.BooleanField(allow_null=True)
+
+
+class CashFlowSerializer(serializers.Serializer):
+    month = serializers.DateField()
+    net = MoneySerializerField()
+
+
+class GoalProjectionsSerializer(serializers.Serializer):
+    monthly_net = MoneySerializerField()
+    cash_flow_months = serializers.IntegerField()
+    cash_flow = CashFlowSerializer(many=True)
+    required_monthly_total = MoneySerializerField()
+    goals = GoalProjectionSerializer(many=True)
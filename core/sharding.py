@@ -0,0 +1,170 @@
+import hashlib
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+
+SHARDED_MODELS = {
+    'transaction', 'savingsgoal', 'budget', 'monthlysummary', 'dailybalance',
+    'recurringtransaction', 'purgejob', 'archivedtransaction',
+}
+
+_forced_alias = ContextVar('shard_alias', default=None)
+_current_user = ContextVar('shard_user', default=None)  # user id, or a request to read it from
+
+
+def sharded_models():
+    # Transactions first, so deleting them doesn't null out recurring FKs one by one.
+    models = [model for model in apps.get_app_config('core').get_models() if is_sharded(model)]
+    return sorted(models, key=lambda model: model._meta.model_name != 'transaction')
+
+
+def shards():
+    return list(getattr(settings, 'MONEY_SHARDS', None) or [DEFAULT_DB_ALIAS])
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'core' and model._meta.model_name in SHARDED_MODELS
+
+
+@lru_cache(maxsize=65536)
+def _pick(user_id, aliases):
+    return max(aliases, key=lambda alias: hashlib.blake2b(f'{alias}:{user_id}'.encode(), digest_size=8).digest())
+
+
+def shard_for(user_id):
+    """The alias holding `user_id`'s rows."""
+    return _pick(int(user_id), tuple(shards()))
+
+
+def by_shard(user_ids):
+    """Group user ids by the shard they live on: {alias: [ids]}."""
+    groups = defaultdict(list)
+    for user_id in user_ids:
+        groups[shard_for(user_id)].append(user_id)
+    return dict(groups)
+
+
+def current_user_id():
+    value = _current_user.get()
+    if value is None or isinstance(value, int):
+        return value
+    user = getattr(value, 'user', None)  # a request; its user is resolved lazily
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def db():
+    """The alias the money tables use in the current context."""
+    return router.db_for_write(apps.get_model('core', 'Transaction'))
+
+
+def atomic(**kwargs):
+    """transaction.atomic() on the current context's shard."""
+    return transaction.atomic(using=db(), **kwargs)
+
+
+@contextmanager
+def for_user(user_id):
+    token = _current_user.set(None if user_id is None else int(user_id))
+    try:
+        yield shard_for(user_id) if user_id is not None else None
+    finally:
+        _current_user.reset(token)
+
+
+@contextmanager
+def on_shard(alias):
+    token = _forced_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _forced_alias.reset(token)
+
+
+def each_shard():
+    """Yield every shard alias with the money tables routed to it."""
+    for alias in shards():
+        with on_shard(alias):
+            yield alias
+
+
+class UserShardRouter:
+    """
+    Puts every row of the SHARDED_MODELS tables on its user's shard from
+    settings.MONEY_SHARDS, picked by rendezvous hashing of the user id, so
+    adding a shard moves only the ~1/N of users that now hash to it (see
+    `manage.py rebalance_shards`). Users, sessions and everything else stay
+    on `default`.
+
+    Querysets carry no user, so money tables are routed by, in order: the
+    instance in the hints (a User, or a row with a user_id), which covers
+    save(), delete() and related managers; an `on_shard(alias)` block, for
+    jobs that sweep whole shards; then the request's user (ShardMiddleware)
+    or a `for_user(user_id)` block in threads and commands.
+    """
+    def _route(self, model, instance=None, **hints):
+        if not is_sharded(model):
+            # Even when the hint is a sharded row (following txn.user), which
+            # Django would otherwise route to that row's database.
+            return DEFAULT_DB_ALIAS
+        user_id = None
+        if instance is not None:
+            if isinstance(instance, get_user_model()):
+                user_id = instance.pk
+            elif is_sharded(type(instance)):
+                user_id = instance.user_id
+        if user_id is not None:
+            return shard_for(user_id)
+        forced = _forced_alias.get()
+        if forced is not None:
+            return forced
+        user_id = current_user_id()
+        return shard_for(user_id) if user_id is not None else None
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Sharded rows point at users on `default`; that's the one allowed cross-database link.
+        user_model = get_user_model()
+        if (isinstance(obj1, user_model) and is_sharded(type(obj2))) or \
+                (isinstance(obj2, user_model) and is_sharded(type(obj1))):
+            return True
+        return None
+
+
+class ShardMiddleware:
+    """Route the request's money queries to its user's shard."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'MONEY_SHARDS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_user.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_user.reset(token)
+
+    async def __acall__(self, request):
+        # Context variables follow the request into sync_to_async threads.
+        token = _current_user.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_user.reset(token)
@@ -0,0 +1,51 @@
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import authcache, caching, search, sharding
+from .models import Budget, SavingsGoal, Transaction
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=SavingsGoal)
+@receiver(post_delete, sender=SavingsGoal)
+def invalidate_dashboard(sender, instance, **kwargs):
+    caching.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    authcache.forget(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, user, **kwargs):
+    if user is not None:
+        authcache.forget(user.pk)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_rows(sender, instance, using, **kwargs):
+    # The collector only cascades within the user's own database.
+    alias = sharding.shard_for(instance.pk)
+    if alias != using:
+        for model in sharding.sharded_models():
+            model._base_manager.using(alias).filter(user_id=instance.pk).delete()
+
+
+@receiver(post_migrate)
+def ensure_note_index(sender, using, **kwargs):
+    # A later migration that rebuilds core_transaction on SQLite drops the
+    # note index triggers; put them back once the index's migration is in.
+    if sender.name != 'core':
+        return
+    connection = connections[using]
+    if ('core', search.MIGRATION) in MigrationRecorder(connection).applied_migrations():
+        search.install(connection)
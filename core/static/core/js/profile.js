@@ -0,0 +1,19 @@
+// Profile page popups. Nothing is sent to the server yet.
+function showPopup(event) {
+  event.preventDefault();
+  const popup = document.getElementById('popup');
+  popup.classList.add('show');
+  setTimeout(() => popup.classList.remove('show'), 3000);
+}
+
+function confirmDelete() {
+  document.getElementById('confirmPopup').classList.add('show');
+}
+
+function closeConfirm() {
+  document.getElementById('confirmPopup').classList.remove('show');
+}
+
+document.querySelectorAll('form[data-popup]').forEach(form => form.addEventListener('submit', showPopup));
+document.querySelectorAll('[data-action="confirm-delete"]').forEach(button => button.addEventListener('click', confirmDelete));
+document.querySelectorAll('[data-action="close-confirm"]').forEach(button => button.addEventListener('click', closeConfirm));
@@ -0,0 +1,40 @@
+// Charts for the reports page; needs Chart.js loaded first.
+const rolling = JSON.parse(document.getElementById('rolling-data').textContent);
+new Chart(document.getElementById('rollingChart'), {
+  type: 'line',
+  data: {
+    labels: rolling.labels,
+    datasets: [{ label: 'Spend (₹)', data: rolling.values, borderColor: '#457b9d', pointRadius: 0 }]
+  },
+  options: { plugins: { legend: { display: false } } }
+});
+
+const flowCanvas = document.getElementById('flowChart');
+const flowChart = new Chart(flowCanvas, {
+  data: {
+    labels: [],
+    datasets: [
+      { type: 'bar', label: 'Income (₹)', data: [], backgroundColor: '#a8dadc' },
+      { type: 'bar', label: 'Expense (₹)', data: [], backgroundColor: '#e63946' },
+      { type: 'line', label: 'Balance (₹)', data: [], borderColor: '#1d3557', pointRadius: 0 }
+    ]
+  }
+});
+
+async function loadFlows(bucket) {
+  const response = await fetch(flowCanvas.dataset.src + '?bucket=' + bucket);
+  const series = await response.json();
+  flowChart.data.labels = series.labels;
+  flowChart.data.datasets[0].data = series.income;
+  flowChart.data.datasets[1].data = series.expense;
+  flowChart.data.datasets[2].data = series.balance;
+  flowChart.update();
+  document.querySelectorAll('.bucket-picker button').forEach(button => {
+    button.classList.toggle('active', button.dataset.bucket === bucket);
+  });
+}
+
+document.querySelectorAll('.bucket-picker button').forEach(button => {
+  button.addEventListener('click', () => loadFlows(button.dataset.bucket));
+});
+loadFlows('month');
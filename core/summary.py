@@ -0,0 +1,78 @@
+from django.db.models import OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .fields import MoneyField
+from .budgets import OVERALL
+from .models import Budget, DailyBalance, MonthlySummary
+from .money import ZERO
+
+
+def month_bounds(day):
+    # First day of the month containing `day` and first day of the next one.
+    start = day.replace(day=1)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def _money_sum(field, condition):
+    return Coalesce(
+        Sum(field, filter=condition),
+        Value(ZERO, output_field=MoneyField()),
+        output_field=MoneyField(),
+    )
+
+
+def get_dashboard_summary(user, today=None):
+    """
+    Income, expense, balance, month-to-date spend and budget figures for `user`,
+    computed in a single query with filtered aggregates over the user's
+    MonthlySummary rows (one per month and category, not one per transaction),
+    a subquery for the current month's overall budget and an index lookup of
+    the latest running balance in the daily ledger. The query is rooted on the
+    money tables rather than User so it runs on the user's shard; a user with
+    no transactions yet gets a second query for just their budget.
+    """
+    today = today or timezone.localdate()
+    month_start, _ = month_bounds(today)
+
+    budget = Budget.objects.filter(
+        user=OuterRef('user_id'), month=month_start, category=OVERALL
+    ).values('limit')[:1]
+    balance = DailyBalance.objects.filter(user=OuterRef('user_id')).order_by('-date').values('balance')[:1]
+
+    row = (
+        MonthlySummary.objects.filter(user=user)
+        .values('user_id')
+        .annotate(
+            total_income=_money_sum('total', Q(is_income=True)),
+            total_expense=_money_sum('total', Q(is_income=False)),
+            this_month_expense=_money_sum('total', Q(is_income=False, month=month_start)),
+            current_budget=Subquery(budget),
+            balance=Subquery(balance),
+        )
+        .order_by('user_id')
+        .first()
+    )
+    if row is None:
+        row = {'current_budget': Budget.objects.filter(
+            user=user, month=month_start, category=OVERALL
+        ).values_list('limit', flat=True).first()}
+
+    total_income = row.get('total_income', ZERO)
+    total_expense = row.get('total_expense', ZERO)
+    this_month_expense = row.get('this_month_expense', ZERO)
+    current_budget = row.get('current_budget') or ZERO
+    balance = row.get('balance') or ZERO
+
+    return {
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'balance': balance,
+        'this_month_expense': this_month_expense,
+        'current_budget': current_budget,
+        'budget_remaining': current_budget - this_month_expense,
+    }
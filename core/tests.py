@@ -0,0 +1,582 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import analytics, archive, authcache, ledger, purge, recurring, rollups, search, sharding
+from .importer import RowError, parse_row
+from .models import (
+    ArchivedTransaction, Budget, Category, DailyBalance, MonthlySummary, PurgeJob, RecurringTransaction, Transaction,
+)
+from .money import Money
+from .summary import get_dashboard_summary
+
+TODAY = date(2024, 3, 15)
+
+
+class DashboardSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('summary', password='pass')
+        entries = [
+            Transaction(user=cls.user, amount=Money.from_rupees('50000'), is_income=True,
+                        category=Category.OTHER, date=date(2024, 2, 1)),
+            Transaction(user=cls.user, amount=Money.from_rupees('1200.50'), category=Category.FOOD,
+                        date=date(2024, 2, 20)),
+            Transaction(user=cls.user, amount=Money.from_rupees('800'), category=Category.FOOD,
+                        date=date(2024, 3, 2)),
+            Transaction(user=cls.user, amount=Money.from_rupees('300.25'), category=Category.TRANSPORT,
+                        date=date(2024, 3, 10)),
+        ]
+        for txn in entries:
+            txn.save()
+        rollups.apply_transactions(entries)
+        Budget.objects.create(user=cls.user, month=date(2024, 3, 1), limit=Money.from_rupees('5000'))
+
+    def test_one_query_with_transactions_and_budget(self):
+        with self.assertNumQueries(1):
+            summary = get_dashboard_summary(self.user, today=TODAY)
+        self.assertEqual(summary, {
+            'total_income': Money.from_rupees('50000'),
+            'total_expense': Money.from_rupees('2300.75'),
+            'balance': Money.from_rupees('47699.25'),
+            'this_month_expense': Money.from_rupees('1100.25'),
+            'current_budget': Money.from_rupees('5000'),
+            'budget_remaining': Money.from_rupees('3899.75'),
+        })
+
+    def test_two_queries_without_transactions(self):
+        newcomer = User.objects.create_user('newcomer', password='pass')
+        Budget.objects.create(user=newcomer, month=date(2024, 3, 1), limit=Money.from_rupees('2000'))
+        with self.assertNumQueries(2):
+            summary = get_dashboard_summary(newcomer, today=TODAY)
+        self.assertEqual(summary['current_budget'], Money.from_rupees('2000'))
+        self.assertEqual(summary['budget_remaining'], Money.from_rupees('2000'))
+        self.assertEqual(summary['total_expense'], Money(0))
+        self.assertEqual(summary['balance'], Money(0))
+
+
+class ReportsChartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('charts', password='pass')
+        txn = Transaction.objects.create(user=cls.user, amount=Money.from_rupees('250'), category=Category.FOOD,
+                                         date=date(2024, 3, 2))
+        rollups.apply_transaction(txn)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_out_of_range_dates_are_clamped(self):
+        response = self.client.get(reverse('core:reports_chart'), {
+            'start': '0001-01-01', 'end': '9999-12-31', 'bucket': 'day',
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['start'], '2024-03-02')
+        self.assertEqual(data['end'], timezone.localdate().isoformat())
+        self.assertEqual(sum(data['expense']), 250)
+
+        response = self.client.get(reverse('core:reports_chart'), {'end': '0001-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['balance'], [0])
+
+    def test_start_after_end_is_rejected(self):
+        response = self.client.get(reverse('core:reports_chart'), {'start': '2024-03-02', 'end': '2024-03-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportRowTests(SimpleTestCase):
+    def test_amount_rounding_to_zero_is_rejected(self):
+        with self.assertRaisesMessage(RowError, "amount must be positive"):
+            parse_row({'date': '2024-03-02', 'amount': '0.001'})
+
+    def test_amount_rounds_half_up(self):
+        row = parse_row({'date': '2024-03-02', 'amount': '10.125', 'type': 'income'})
+        self.assertEqual(row['amount'], Money(1013))
+        self.assertTrue(row['is_income'])
+
+    def test_digit_limit_applies_after_rounding(self):
+        with self.assertRaisesMessage(RowError, "too large"):
+            parse_row({'date': '2024-03-02', 'debit': '99999999.995'})
+        self.assertEqual(parse_row({'date': '2024-03-02', 'debit': '99999999.99'})['amount'],
+                         Money(9999999999))
+
+
+@override_settings(TRANSACTION_PURGE_IN_THREAD=False)
+class PurgeTests(TestCase):
+    def test_rows_added_after_the_request_survive_rebalanced_archive_ids(self):
+        user = User.objects.create_user('purge', password='pass')
+        old = Transaction.objects.create(user=user, amount=Money.from_rupees('10'), category=Category.FOOD,
+                                         date=date(2024, 3, 2))
+        # Archived on another shard before a rebalance: ids from that shard's sequence.
+        stamp = timezone.now()
+        archive.append(user.pk, date(2023, 1, 1), [
+            (old.pk + 1000, date(2023, 1, 5), stamp, Money.from_rupees('20'), False, Category.FOOD, '', None),
+        ])
+        job = purge.start_purge(user)
+        newer = Transaction.objects.create(user=user, amount=Money.from_rupees('30'), category=Category.FOOD,
+                                           date=date(2024, 3, 3))
+        job = purge.run_job(job.pk)
+        self.assertEqual(job.deleted, 2)
+        self.assertEqual(list(Transaction.objects.filter(user=user)), [newer])
+        self.assertFalse(ArchivedTransaction.objects.filter(user=user).exists())
+
+
+class ShardRoutingTests(SimpleTestCase):
+    router = sharding.UserShardRouter()
+
+    @override_settings(MONEY_SHARDS=['a', 'b', 'c'])
+    def test_users_hash_evenly_and_a_new_shard_only_takes_users(self):
+        before = {user_id: sharding.shard_for(user_id) for user_id in range(1, 3001)}
+        self.assertEqual(sharding.shard_for('42'), before[42])
+        groups = sharding.by_shard(before)
+        self.assertEqual(sorted(groups), ['a', 'b', 'c'])
+        for ids in groups.values():
+            self.assertEqual(ids, sorted(ids))
+            self.assertGreater(len(ids), 800)
+        with self.settings(MONEY_SHARDS=['a', 'b', 'c', 'd']):
+            moved = {user_id for user_id, alias in before.items() if sharding.shard_for(user_id) != alias}
+            self.assertEqual({sharding.shard_for(user_id) for user_id in moved}, {'d'})
+            self.assertLess(len(moved), 1000)
+
+    @override_settings(MONEY_SHARDS=['shard0', 'shard1'])
+    def test_route_precedence(self):
+        user_id = next(n for n in range(1, 100) if sharding.shard_for(n) == 'shard1')
+        txn = Transaction(user_id=user_id)
+        route = self.router.db_for_read
+        self.assertIsNone(route(Transaction))
+        self.assertEqual(route(User), 'default')
+        # Following txn.user hints with the transaction; users still live on default.
+        self.assertEqual(route(User, instance=txn), 'default')
+        self.assertEqual(route(Transaction, instance=txn), 'shard1')
+        self.assertEqual(route(MonthlySummary, instance=User(pk=user_id)), 'shard1')
+        with sharding.for_user(user_id):
+            self.assertEqual(route(Budget), 'shard1')
+            with sharding.on_shard('shard0'):
+                self.assertEqual(route(Budget), 'shard0')
+                self.assertEqual(self.router.db_for_write(Transaction, instance=txn), 'shard1')
+        self.assertEqual(list(sharding.each_shard()), ['shard0', 'shard1'])
+        self.assertIsNone(route(Transaction))
+
+    def test_unsharded_deployments_use_default(self):
+        self.assertEqual(sharding.shards(), ['default'])
+        self.assertEqual(sharding.shard_for(7), 'default')
+        with sharding.for_user(7):
+            self.assertEqual(sharding.db(), 'default')
+
+
+@override_settings(MONEY_SHARDS=['shard0', 'shard1'], DATABASE_ROUTERS=['core.sharding.UserShardRouter'],
+                   TRANSACTION_PURGE_IN_THREAD=False)
+class ShardingTests(TestCase):
+    databases = {'default', 'shard0', 'shard1'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {}
+        n = 0
+        while len(cls.users) < 2:
+            user = User.objects.create_user(f'sharded{n}', password='pass')
+            cls.users.setdefault(sharding.shard_for(user.pk), user)
+            n += 1
+        for alias, user in cls.users.items():
+            with sharding.for_user(user.pk):
+                txn = Transaction.objects.create(user=user, amount=Money.from_rupees('75'),
+                                                 category=Category.FOOD, date=date(2024, 3, 2))
+                rollups.apply_transaction(txn)
+
+    def test_money_rows_live_on_their_users_shard(self):
+        for alias, user in self.users.items():
+            other = 'shard1' if alias == 'shard0' else 'shard0'
+            self.assertTrue(Transaction.objects.using(alias).filter(user=user).exists())
+            self.assertTrue(MonthlySummary.objects.using(alias).filter(user=user).exists())
+            self.assertFalse(Transaction.objects.using(other).filter(user=user).exists())
+            self.assertFalse(Transaction.objects.using('default').filter(user=user).exists())
+
+    def test_following_a_money_row_to_its_user(self):
+        for user in self.users.values():
+            with sharding.for_user(user.pk):
+                txn = Transaction.objects.get(user=user)
+                self.assertEqual(txn.user, user)
+                self.assertEqual(user.entries.count(), 1)
+
+    def test_purge_on_a_shard(self):
+        user, bystander = self.users['shard0'], self.users['shard1']
+        with sharding.for_user(user.pk):
+            job = purge.start_purge(user)
+            self.assertEqual(str(PurgeJob.objects.get(pk=job.pk)), f"Purge for {user} (pending, 0 deleted)")
+            job = purge.run_job(job.pk)
+            self.assertEqual(job.deleted, 1)
+            self.assertFalse(Transaction.objects.filter(user=user).exists())
+            self.assertFalse(MonthlySummary.objects.filter(user=user).exists())
+        self.assertTrue(Transaction.objects.using('shard1').filter(user=bystander).exists())
+
+    def test_requests_read_the_users_shard(self):
+        for user in self.users.values():
+            self.client.force_login(user)
+            response = self.client.get(reverse('core:dashboard'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['total_expense'], Money.from_rupees('75'))
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('exporter', password='pass')
+        Transaction.objects.bulk_create(
+            Transaction(user=cls.user, amount=Money(100 + i), category=Category.FOOD, date=date(2024, 3, 1 + i % 28))
+            for i in range(1200)
+        )
+
+    def test_wsgi_export_streams_every_row(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:export_transactions'))
+        self.assertFalse(response.is_async)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'date,type,category,amount,note')
+        self.assertEqual(len(lines), 1201)
+
+    async def test_asgi_export_streams_without_buffering(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('core:export_transactions'), {'format': 'ndjson'})
+        self.assertTrue(response.is_async)  # a sync iterator would be read whole before sending
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)  # 500 lines a chunk
+        self.assertEqual(sum(chunk.count(b'\n') for chunk in chunks), 1200)
+
+
+class ConditionalPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('etags', password='pass')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    @override_settings(DATA_CACHE_ENABLED=False)
+    def test_no_data_validators_without_a_shared_cache(self):
+        response = self.client.get(reverse('core:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    @override_settings(DATA_CACHE_ENABLED=True)
+    def test_revalidation_until_a_write(self):
+        etag = self.client.get(reverse('core:dashboard'))['ETag']
+        self.assertEqual(self.client.get(reverse('core:dashboard'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(user=self.user, amount=Money.from_rupees('5'), date=date(2024, 3, 2))
+        self.assertEqual(self.client.get(reverse('core:dashboard'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reports', password='pass')
+        entries = [
+            Transaction(user=cls.user, amount=Money.from_rupees('1000'), is_income=True, date=date(2024, 1, 31)),
+            Transaction(user=cls.user, amount=Money.from_rupees('40'), category=Category.FOOD, date=date(2024, 1, 1)),
+            Transaction(user=cls.user, amount=Money.from_rupees('60'), category=Category.FOOD, date=date(2024, 3, 4)),
+            Transaction(user=cls.user, amount=Money.from_rupees('25'), category=Category.BILLS, date=date(2024, 3, 4)),
+        ]
+        Transaction.objects.bulk_create(entries)
+        rollups.apply_transactions(entries)
+        archive.archive_user(cls.user.pk, date(2024, 2, 1))  # January moves into an archive block
+
+    def test_three_queries_and_no_row_per_transaction(self):
+        with self.assertNumQueries(3):
+            report = analytics.build_report(self.user, today=TODAY)
+        self.assertEqual(report['transaction_count'], 4)
+        self.assertEqual(report['by_category'], [
+            {'category': 'Food', 'total': Money.from_rupees('100'), 'count': 2},
+            {'category': 'Bills', 'total': Money.from_rupees('25'), 'count': 1},
+        ])
+        self.assertEqual([(row['month'], row['net']) for row in report['by_month']], [
+            (date(2024, 1, 1), Money.from_rupees('960')), (date(2024, 3, 1), Money.from_rupees('-85')),
+        ])
+        weekdays = {row['weekday']: (row['total'], row['count']) for row in report['by_weekday']}
+        self.assertEqual(weekdays['Mon'], (Money.from_rupees('125'), 3))  # 2024-01-01 and 2024-03-04
+        self.assertEqual(report['rolling_current'], Money.from_rupees('85'))
+
+    def test_reports_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:reports'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['transaction_count'], 4)
+
+
+class TransactionApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('api', password='pass')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_bulk_reports_non_positive_amounts_per_item(self):
+        items = [
+            {'date': '2024-03-02', 'amount': '12.50', 'category': 'food'},
+            {'date': '2024-03-02', 'amount': '0', 'category': 'food'},
+            {'date': '2024-03-02', 'amount': '-5', 'category': 'food'},
+        ]
+        response = self.client.post(reverse('core:transaction-bulk'), items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['created'], 1)
+        self.assertEqual([error['index'] for error in body['errors']], [1, 2])
+        self.assertEqual(body['errors'][1]['errors'], {'amount': ['Must be positive.']})
+        self.assertEqual(MonthlySummary.objects.get(user=self.user).total, Money.from_rupees('12.50'))
+
+    def test_create_rejects_a_negative_amount(self):
+        response = self.client.post(reverse('core:transaction-list'),
+                                    {'date': '2024-03-02', 'amount': '-5', 'category': 'food'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+
+
+class UserCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cached', password='pass')
+
+    def setUp(self):
+        authcache._users.clear()
+        self.addCleanup(authcache._users.clear)
+        self.client.force_login(self.user)
+
+    def test_deactivation_elsewhere_applies_on_the_next_request_by_default(self):
+        self.assertEqual(self.client.get(reverse('core:dashboard')).status_code, 200)
+        # An update that skips post_save, as one made by another worker would here.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('core:dashboard')).status_code, 302)
+
+    @override_settings(USER_CACHE_TTL=30)
+    def test_saving_the_user_forgets_the_cached_copy(self):
+        self.assertEqual(self.client.get(reverse('core:dashboard')).status_code, 200)
+        self.assertTrue(authcache._users)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('core:dashboard')).status_code, 302)
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('rollup', password='pass')
+        cls.other = User.objects.create_user('rollup-other', password='pass')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, day, amount, category='food', is_income=False):
+        response = self.client.post(reverse('core:transaction-list'), {
+            'date': day, 'amount': amount, 'category': category, 'is_income': is_income,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def assertNoDrift(self):
+        self.assertEqual(rollups.find_drift(rollups.expected_rows(), rollups.stored_rows()), [])
+
+    def test_edits_and_deletes_through_the_api_leave_no_drift(self):
+        budget = Budget.objects.create(user=self.user, month=date(2024, 3, 1), category='food',
+                                       limit=Money.from_rupees('1000'))
+        moved = self.create('2024-03-02', '100.00')
+        deleted = self.create('2024-03-05', '40.00')
+        self.create('2024-03-09', '5000', 'other', is_income=True)
+        # Change month, category and amount at once: the old key must lose it all.
+        response = self.client.patch(reverse('core:transaction-detail', args=[moved]), {
+            'date': '2024-04-01', 'amount': '75.50', 'category': 'transport',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(reverse('core:transaction-detail', args=[deleted])).status_code, 204)
+
+        self.assertNoDrift()
+        self.assertEqual(rollups.stored_rows(), {
+            (self.user.pk, date(2024, 3, 1), 'other', True): (Money.from_rupees('5000'), 1),
+            (self.user.pk, date(2024, 4, 1), 'transport', False): (Money.from_rupees('75.50'), 1),
+        })
+        budget.refresh_from_db()
+        self.assertEqual(budget.spent, Money(0))
+
+    def test_apply_batch_agrees_with_apply_rows(self):
+        rows = [
+            (self.user.pk, date(2024, 1, 31), 'food', False, Money.from_rupees('10')),
+            (self.user.pk, date(2024, 2, 1), 'food', False, Money.from_rupees('20')),
+            (self.other.pk, date(2024, 1, 15), 'other', True, Money.from_rupees('300')),
+        ]
+        Transaction.objects.bulk_create(
+            Transaction(user_id=user_id, date=day, category=category, is_income=is_income, amount=amount)
+            for user_id, day, category, is_income, amount in rows
+        )
+        rollups.apply_batch(rows)
+        self.assertNoDrift()
+        rollups.apply_batch(rows[:1], sign=-1)
+        rollups.apply_rows(rows[:1])
+        self.assertNoDrift()
+
+    def test_a_skipped_reversal_shows_as_drift_until_rebuilt(self):
+        self.create('2024-03-02', '100.00')
+        self.create('2024-03-20', '60.00')
+        # A queryset delete bypasses perform_destroy and so the reversal.
+        Transaction.objects.filter(user=self.user, date=date(2024, 3, 20)).delete()
+        key = (self.user.pk, date(2024, 3, 1), 'food', False)
+        self.assertEqual(rollups.find_drift(rollups.expected_rows(), rollups.stored_rows()), [key])
+        rollups.rebuild([self.user])
+        self.assertNoDrift()
+        self.assertEqual(rollups.stored_rows()[key], (Money.from_rupees('100'), 1))
+
+
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ledger', password='pass')
+
+    def add(self, day, rupees, is_income=False):
+        txn = Transaction.objects.create(user=self.user, date=day, amount=Money.from_rupees(rupees),
+                                         is_income=is_income, category=Category.OTHER)
+        rollups.apply_transaction(txn)
+        return txn
+
+    def test_balances_after_out_of_order_inserts(self):
+        self.add(date(2024, 3, 10), '1000', is_income=True)
+        self.add(date(2024, 3, 20), '300')
+        # Back-dated: before every existing day, between two, and onto an existing day.
+        self.add(date(2024, 3, 1), '500', is_income=True)
+        self.add(date(2024, 3, 15), '200')
+        self.add(date(2024, 3, 10), '50')
+
+        self.assertEqual(ledger.find_drift(ledger.expected_rows(), ledger.stored_rows()), [])
+        self.assertEqual(ledger.balance_at(self.user, date(2024, 2, 28)), Money(0))
+        self.assertEqual(ledger.balance_at(self.user, date(2024, 3, 1)), Money.from_rupees('500'))
+        self.assertEqual(ledger.balance_at(self.user, date(2024, 3, 12)), Money.from_rupees('1450'))
+        self.assertEqual(ledger.current_balance(self.user), Money.from_rupees('950'))
+        self.assertEqual(ledger.series(self.user, date(2024, 3, 5), date(2024, 3, 15)), [
+            (date(2024, 3, 5), Money.from_rupees('500')),
+            (date(2024, 3, 10), Money.from_rupees('1450')),
+            (date(2024, 3, 15), Money.from_rupees('1250')),
+        ])
+
+    def test_deleting_a_back_dated_row_shifts_later_days_and_drops_its_own(self):
+        self.add(date(2024, 3, 10), '1000', is_income=True)
+        early = self.add(date(2024, 3, 5), '100')
+        self.add(date(2024, 3, 25), '400')
+        early.delete()
+        rollups.apply_transaction(early, sign=-1)
+
+        self.assertEqual(ledger.find_drift(ledger.expected_rows(), ledger.stored_rows()), [])
+        self.assertFalse(DailyBalance.objects.filter(user=self.user, date=date(2024, 3, 5)).exists())
+        self.assertEqual(ledger.balance_at(self.user, date(2024, 3, 10)), Money.from_rupees('1000'))
+        self.assertEqual(ledger.current_balance(self.user), Money.from_rupees('600'))
+
+
+class RecurringStepTests(SimpleTestCase):
+    def dates(self, start, today, frequency='monthly', interval=1, end=None):
+        rule = RecurringTransaction(frequency=frequency, interval=interval, start_date=start,
+                                    end_date=end, next_run=start)
+        return recurring.occurrences(rule, today)
+
+    def test_monthly_clamps_to_month_end_and_returns_to_the_anchor(self):
+        self.assertEqual(self.dates(date(2024, 1, 31), date(2024, 5, 1)), (
+            [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)],
+            date(2024, 5, 31),
+        ))
+
+    def test_yearly_from_a_leap_day(self):
+        self.assertEqual(self.dates(date(2024, 2, 29), date(2028, 3, 1), 'yearly'), (
+            [date(2024, 2, 29), date(2025, 2, 28), date(2026, 2, 28), date(2027, 2, 28), date(2028, 2, 29)],
+            date(2029, 2, 28),
+        ))
+
+    def test_intervals(self):
+        self.assertEqual(self.dates(date(2024, 1, 31), date(2024, 6, 1), interval=2)[0],
+                         [date(2024, 1, 31), date(2024, 3, 31), date(2024, 5, 31)])
+        self.assertEqual(self.dates(date(2024, 3, 1), date(2024, 3, 31), 'weekly', 2)[0],
+                         [date(2024, 3, 1), date(2024, 3, 15), date(2024, 3, 29)])
+        self.assertEqual(self.dates(date(2024, 2, 27), date(2024, 3, 5), 'daily', 3),
+                         ([date(2024, 2, 27), date(2024, 3, 1), date(2024, 3, 4)], date(2024, 3, 7)))
+
+    def test_finishes_at_the_end_date(self):
+        self.assertEqual(self.dates(date(2024, 1, 15), date(2024, 12, 31), end=date(2024, 3, 20)),
+                         ([date(2024, 1, 15), date(2024, 2, 15), date(2024, 3, 15)], None))
+
+
+class RecurringRunTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('recurring', password='pass')
+        cls.rent = RecurringTransaction.objects.create(user=cls.user, amount=Money.from_rupees('15000'),
+                                                       category=Category.OTHER, start_date=date(2024, 1, 31))
+        cls.salary = RecurringTransaction.objects.create(user=cls.user, amount=Money.from_rupees('80000'),
+                                                         is_income=True, start_date=date(2024, 1, 1),
+                                                         end_date=date(2024, 2, 1))
+
+    def dates(self, rule):
+        return list(Transaction.objects.filter(recurring=rule).order_by('date').values_list('date', flat=True))
+
+    def test_reruns_are_idempotent_and_catch_up(self):
+        self.assertEqual(recurring.run_due(date(2024, 3, 1)), (2, 4))
+        self.assertEqual(recurring.run_due(date(2024, 3, 1)), (0, 0))
+        self.assertEqual(self.dates(self.rent), [date(2024, 1, 31), date(2024, 2, 29)])
+        self.assertEqual(self.dates(self.salary), [date(2024, 1, 1), date(2024, 2, 1)])
+
+        # A run missed on Mar 31 is caught up on the next one.
+        self.assertEqual(recurring.run_due(date(2024, 5, 2)), (1, 2))
+        self.assertEqual(self.dates(self.rent)[2:], [date(2024, 3, 31), date(2024, 4, 30)])
+        self.rent.refresh_from_db()
+        self.salary.refresh_from_db()
+        self.assertEqual(self.rent.next_run, date(2024, 5, 31))
+        self.assertIsNone(self.salary.next_run)
+        self.assertEqual(rollups.find_drift(rollups.expected_rows(), rollups.stored_rows()), [])
+        self.assertEqual(ledger.current_balance(self.user), Money.from_rupees('100000'))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('search', password='pass')
+        other = User.objects.create_user('search-other', password='pass')
+        Transaction.objects.bulk_create([
+            Transaction(user=cls.user, amount=Money.from_rupees('1800'), category=Category.BILLS,
+                        note='Electricity bill for March', date=date(2024, 3, 5)),
+            Transaction(user=cls.user, amount=Money.from_rupees('600'), category=Category.BILLS,
+                        note='Electricity bill, Pune flat', date=date(2024, 2, 5)),
+            Transaction(user=cls.user, amount=Money.from_rupees('15000'), category=Category.OTHER,
+                        note='Rent', date=date(2024, 3, 1)),
+            Transaction(user=other, amount=Money.from_rupees('900'), category=Category.BILLS,
+                        note='Electricity bill', date=date(2024, 3, 6)),
+        ])
+
+    def notes(self, query, **filters):
+        return [txn.note for txn in search.search(self.user, query, **filters)]
+
+    def assertSearches(self):
+        self.assertEqual(self.notes('elec bill'), ['Electricity bill for March', 'Electricity bill, Pune flat'])
+        self.assertEqual(self.notes('bill', start=date(2024, 3, 1)), ['Electricity bill for March'])
+        self.assertEqual(self.notes('bill', max_amount=Money.from_rupees('1000'), category=Category.BILLS),
+                         ['Electricity bill, Pune flat'])
+        self.assertEqual(self.notes('rent', is_income=True), [])
+        self.assertEqual(self.notes('groceries'), [])
+        self.assertEqual(self.notes('  !? '), [])
+
+    def test_indexed_search(self):
+        if connection.vendor == 'sqlite' and not search._has_fts(connection):
+            self.skipTest("SQLite built without FTS5")
+        self.assertSearches()
+        # The index follows updates and queryset deletes, not just inserts.
+        Transaction.objects.filter(note='Rent').update(note='Rent, Pune flat')
+        Transaction.objects.filter(note='Electricity bill, Pune flat').delete()
+        self.assertEqual(self.notes('pune'), ['Rent, Pune flat'])
+        if connection.vendor == 'sqlite':
+            Transaction.objects.create(user=self.user, amount=Money.from_rupees('120'), note='Café Coffee Day',
+                                       category=Category.FOOD, date=date(2024, 3, 7))
+            self.assertEqual(self.notes('cafe'), ['Café Coffee Day'])
+
+    def test_fallback_without_the_index(self):
+        search.uninstall(connection)
+        self.addCleanup(search._fts_tables.pop, connection.alias, None)
+        self.assertSearches()
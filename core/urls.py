@@ -1,16 +1,30 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+from . import api, views
 
 app_name = 'core'
 
+router = DefaultRouter()
+router.register('transactions', api.TransactionViewSet, basename='transaction')
+router.register('goals', api.SavingsGoalViewSet, basename='goal')
+router.register('budgets', api.BudgetViewSet, basename='budget')
+
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('transactions/add/', views.add_transaction, name='add_transaction'),
+    path('transactions/import/', views.import_transactions, name='import_transactions'),
+    path('transactions/export/', views.export_transactions, name='export_transactions'),
     path('reports/', views.reports, name='reports'),
+    path('reports/chart/', views.reports_chart, name='reports_chart'),
+    path('goals/', views.goals, name='goals'),
+    path('goals/add/', views.add_goal, name='add_goal'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
     path('register/', views.register, name='register'),
     path('save_budget/', views.save_budget, name='save_budget'),
     path('clear_data/', views.clear_data, name='clear_data'),
     path('profile/', views.profile, name='profile'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
+    path('metrics/', views.request_metrics, name='request_metrics'),
+    path('api/', include(router.urls)),
 ]
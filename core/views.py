@@ -1,9 +1,23 @@
+import io
+from functools import partial
+
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.views.decorators.cache import cache_control
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
-from .models import Transaction, SavingsGoal, Category
-from .forms import RegisterForm, TransactionForm
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from . import aio, analytics, archive, budgets, caching, charts, exporter, importer, metrics, projections, purge, rollups, sharding
+from .models import Budget, Transaction, Category
+from .forms import RegisterForm, TransactionForm, ImportTransactionsForm, ExportForm, SavingsGoalForm, ChartForm
+from .conditional import conditional_page
+from .summary import get_dashboard_summary
+
+# Per-user pages: browsers may keep a copy but must revalidate it (ETag) each time.
+private_page = cache_control(private=True, no_cache=True)
 
 def register(request):
   if request.method == 'POST':
@@ -33,50 +47,27 @@ def user_logout(request):
   logout(request)
   return redirect('core:login')
 
-import json
-from django.utils import timezone
-from datetime import datetime
-from django.db.models import Sum
-from django.core.serializers.json import DjangoJSONEncoder
-
-@login_required
-def dashboard(request):
+@aio.login_required
+@private_page
+@conditional_page('core/dashboard.html')
+async def dashboard(request):
   user = request.user
-  now = timezone.now()
-  current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-  
-  # --- Budget Logic ---
-  # Simple budget implementation: One budget object per user (or per month).
-  # For simplicity, we'll try to get a 'current month' budget or a general one.
-  # Let's check models.py: Budget has 'month'.
-  # We will try to get the budget for this month.
-  from .models import Budget
-  try:
-      budget_obj = Budget.objects.get(user=user, month__year=now.year, month__month=now.month)
-      current_budget = budget_obj.limit
-  except Budget.DoesNotExist:
-      current_budget = 0
-
-  # --- Quick Stats ---
-  total_income = Transaction.objects.filter(user=user, is_income=True).aggregate(total=Sum('amount'))['total'] or 0
-  total_expense = Transaction.objects.filter(user=user, is_income=False).aggregate(total=Sum('amount'))['total'] or 0
-  balance = total_income - total_expense
-  
-  # Expense this month
-  this_month_expense = Transaction.objects.filter(
-      user=user, is_income=False, date__gte=current_month_start
-  ).aggregate(total=Sum('amount'))['total'] or 0
-
-  transactions = Transaction.objects.filter(user=user).order_by('-date', '-created_at')[:5]
-
-  context = {
-      'total_income': total_income,
-      'total_expense': total_expense,
-      'balance': balance,
-      'transactions': transactions,
-      'current_budget': current_budget,
-      'this_month_expense': this_month_expense,
-  }
+
+  # Totals, month-to-date spend and budget come back from a single query,
+  # budget alerts from the maintained Budget.spent, and the whole context is
+  # cached until the user's data version changes. The three lookups are
+  # independent, so they run at the same time (see core.aio).
+  async def build():
+    context, alerts, recent = await aio.gather(
+      partial(get_dashboard_summary, user),
+      partial(budgets.month_status, user),
+      lambda: list(Transaction.objects.filter(user=user).order_by('-date', '-created_at')[:5]),
+    )
+    context['budget_alerts'] = alerts
+    context['transactions'] = recent
+    return context
+  context = dict(await caching.aget_or_build(user.pk, build))
+  context['categories'] = Category.choices
 
   return render(request, 'core/dashboard.html', context)
 
@@ -95,44 +86,135 @@ def add_transaction(request):
             else:
                 transaction.is_income = False
                 
-            transaction.save()
+            with sharding.atomic():
+                transaction.save()
+                rollups.apply_transaction(transaction)
             return redirect('core:dashboard')
     else:
         form = TransactionForm()
     return render(request, 'core/add_transaction.html', {'form': form})
 
+@login_required
+def import_transactions(request):
+    result = error = None
+    if request.method == 'POST':
+        form = ImportTransactionsForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            # Decode the upload lazily so only one batch of rows is ever held in memory.
+            lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+            try:
+                result = importer.import_csv(request.user, lines)
+            except ValueError as exc:
+                error = str(exc)
+    else:
+        form = ImportTransactionsForm()
+    return render(request, 'core/import_transactions.html', {'form': form, 'result': result, 'error': error})
+
+@login_required
+def export_transactions(request):
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    filters = form.cleaned_data
+    fmt = filters['format'] or 'csv'
+    content_type, render_lines = exporter.FORMATS[fmt]
+
+    queryset = exporter.export_queryset(
+        request.user, start=filters['start'], end=filters['end'], category=filters['category']
+    )
+    archived = archive.export_rows(
+        request.user, start=filters['start'], end=filters['end'], category=filters['category'], using=queryset.db
+    )
+    body = exporter.chunks(render_lines(exporter.iter_rows(queryset, archived)))
+    if isinstance(request, ASGIRequest):
+        body = exporter.aiter_chunks(body)
+    response = StreamingHttpResponse(body, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="transactions.{fmt}"'
+    return response
+
 @login_required
 def clear_data(request):
     if request.method == 'POST':
-        from .models import Transaction
-        Transaction.objects.filter(user=request.user).delete()
+        # Deletion happens in the background in small chunks; see core.purge.
+        purge.start_purge(request.user)
+        caching.invalidate(request.user.pk)
     return redirect('core:dashboard')
 
+@aio.login_required
+@private_page
+@conditional_page('core/reports.html')
+async def reports(request):
+    context = await analytics.abuild_report(request.user)
+    context['rolling_chart'] = {
+        'labels': [row['date'].isoformat() for row in context['rolling_spend']],
+        'values': [float(row['total']) for row in context['rolling_spend']],
+    }
+    return render(request, 'core/reports.html', context)
+
+@login_required
+@private_page
+def reports_chart(request):
+    # Fixed-size chart series; see core.charts.build_series.
+    form = ChartForm(request.GET, user=request.user)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    params = form.cleaned_data
+    data = charts.build_series(
+        request.user, start=params['start'], end=params['end'],
+        bucket=params['bucket'] or 'month', points=params['points'] or charts.DEFAULT_POINTS,
+    )
+    return JsonResponse(data, encoder=DjangoJSONEncoder)
+
+@login_required
+@private_page
+@conditional_page('core/goals.html')
+def goals(request):
+    context = projections.build_projections(request.user)
+    context['form'] = SavingsGoalForm()
+    return render(request, 'core/goals.html', context)
+
 @login_required
-def reports(request):
-    return render(request, 'core/reports.html')
+def add_goal(request):
+    if request.method != 'POST':
+        return redirect('core:goals')
+    form = SavingsGoalForm(request.POST)
+    if form.is_valid():
+        goal = form.save(commit=False)
+        goal.user = request.user
+        goal.save()
+        return redirect('core:goals')
+    context = projections.build_projections(request.user)
+    context['form'] = form
+    return render(request, 'core/goals.html', context, status=400)
+
+@user_passes_test(lambda user: user.is_staff)
+def cache_stats(request):
+    return JsonResponse(caching.stats())
+
+@user_passes_test(lambda user: user.is_staff)
+def request_metrics(request):
+    return JsonResponse(metrics.stats.summary())
 
 @login_required
+@private_page
+@conditional_page('core/profile.html', uses_data=False)
 def profile(request):
     return render(request, 'core/profile.html')
 
 @login_required
 def save_budget(request):
     if request.method == 'POST':
-        amount = request.POST.get('budget_amount')
-        from .models import Budget
-        from django.utils import timezone
-        now = timezone.now()
-        # Update or Create budget for this month
-        budget, created = Budget.objects.get_or_create(
-            user=request.user, 
-            month__year=now.year, 
-            month__month=now.month,
-            defaults={'limit': amount, 'month': now.date()}
-        )
-        if not created:
-            budget.limit = amount
-            budget.save()
-            
+        category = request.POST.get('category', budgets.OVERALL)
+        if category not in Category.values:
+            category = budgets.OVERALL
+        try:
+            limit = Budget._meta.get_field('limit').clean(request.POST.get('budget_amount'), None)
+        except ValidationError:
+            limit = None
+        if limit is None or limit < 0:
+            return HttpResponseBadRequest("Invalid budget amount.")
+        # Upsert on (user, month, category); see core.budgets.
+        budgets.set_limit(request.user, timezone.localdate(), limit, category)
         return redirect('core:dashboard')
     return redirect('core:dashboard')
@@ -0,0 +1,17 @@
+# Gunicorn settings for serving config.asgi with uvicorn workers:
+#
+#     gunicorn config.asgi -c gunicorn.asgi.conf.py
+#
+# (Procfile.asgi). Each worker runs one event loop. Django reconnects to the
+# database per request under ASGI, so DB_QUERY_FANOUT (config/settings.py)
+# stays off here unless DB_CONN_MAX_AGE is set for its pool threads.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+accesslog = '-'
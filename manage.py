@@ -6,7 +6,8 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    default = 'config.test_settings' if sys.argv[1:2] == ['test'] else 'config.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: